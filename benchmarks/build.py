@@ -0,0 +1,106 @@
+from argparse import ArgumentParser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import json
+
+from wizdb.__main__ import deserialize_files
+from wizdb.db import BulkWriter, build_db
+from wizdb.state import State
+
+from .fixture import generate
+from .standin import StandInDeserializer
+
+DEFAULT_SCALES = [1000, 5000, 20000]
+
+
+def _timed(results: dict, name: str, fn, *args):
+    start = perf_counter()
+    value = fn(*args)
+    results[name] = min(results.get(name, float("inf")), perf_counter() - start)
+
+    return value
+
+
+def _make_state(root: Path, types: Path) -> State:
+    return State(root, types, make_deserializer=StandInDeserializer.make)
+
+
+def run_scale(workdir: Path, templates: int, jobs: list, repeat: int) -> dict:
+    root = workdir / f"Root-{templates}"
+    types = workdir / f"types-{templates}.json"
+    generate(root, types, templates)
+
+    results = {}
+    for _ in range(repeat):
+        # A fresh State for each worker count, so no run starts out with
+        # locale, set bonuses or spells an earlier one already loaded.
+        for n in jobs:
+            state = _timed(results, "state", _make_state, root, types)
+            items, mobs = _timed(results, f"deserialize_files (jobs={n})", deserialize_files, state, n)
+
+        with BulkWriter(workdir / f"items-{templates}.db") as db:
+            _timed(results, "build_db", build_db, state, items, mobs, db)
+
+    return {"templates": templates, "items": len(items), "mobs": len(mobs), "seconds": results}
+
+
+def print_report(runs: list):
+    for run in runs:
+        print(f"{run['templates']} templates ({run['items']} items, {run['mobs']} mobs)")
+        for name, seconds in run["seconds"].items():
+            rate = run["templates"] / seconds if seconds else 0
+            print(f"  {name:<28} {seconds:8.3f}s  {rate:10.0f} templates/s")
+
+
+def parse_args():
+    parser = ArgumentParser(prog="benchmarks.build", description="Times wizdb build stages on a synthetic Root/ tree.")
+    parser.add_argument(
+        "-s", "--scale",
+        type=int,
+        action="append",
+        help=f"number of ObjectData templates to generate, may be repeated (default: {DEFAULT_SCALES})",
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        action="append",
+        help="worker counts to time deserialize_files with, may be repeated (default: 1)",
+    )
+    parser.add_argument(
+        "-r", "--repeat",
+        type=int,
+        default=3,
+        help="runs per scale, the fastest is reported (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--keep",
+        type=Path,
+        help="generate fixtures in this directory and keep them instead of using a temporary one",
+    )
+    parser.add_argument(
+        "--json",
+        type=Path,
+        help="also write the results to this JSON file",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    scales = args.scale or DEFAULT_SCALES
+    jobs = args.jobs or [1]
+
+    with TemporaryDirectory(prefix="wizdb-bench-") as tmp:
+        workdir = args.keep or Path(tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+
+        runs = [run_scale(workdir, n, jobs, args.repeat) for n in scales]
+
+    print_report(runs)
+    if args.json is not None:
+        args.json.write_text(json.dumps(runs, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import json
+import marshal
+import random
+from pathlib import Path
+
+EFFECTS = 40
+TABLE_SIZE = 200
+TALENTS = 20
+SET_BONUSES = 25
+SCHOOLS = [b"Fire", b"Ice", b"Storm", b"Myth", b"Life", b"Death", b"Balance"]
+ADJECTIVES = [b"Hat", b"Robe", b"Shoes", b"Weapon", b"Athame", b"Amulet", b"Ring", b"Deck"]
+
+
+class Fixture:
+    def __init__(self, root: Path, seed: int):
+        self.root = root
+        self.random = random.Random(seed)
+        self.manifest = []
+        self.next_id = 1000
+        self.lang = {}
+
+    def write(self, name: str, obj: dict):
+        path = self.root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"BINd" + marshal.dumps(obj))
+
+    def template(self, name: str, obj: dict) -> int:
+        self.next_id += 1
+        self.manifest.append({"m_filename": name.encode(), "m_id": self.next_id})
+        if "m_templateID" in obj:
+            obj["m_templateID"] = self.next_id
+
+        self.write(name, obj)
+        return self.next_id
+
+    def string(self, file: str, key: str, value: str) -> bytes:
+        self.lang.setdefault(file, []).append((key, value))
+        return f"{file}_{key}".encode()
+
+    def stat_effect(self) -> dict:
+        return {
+            "m_effectName": f"Effect{self.random.randrange(EFFECTS)}".encode(),
+            "m_lookupIndex": self.random.randrange(TABLE_SIZE),
+        }
+
+    def save(self, types: Path):
+        self.write("TemplateManifest.xml", {"m_serializedTemplates": self.manifest})
+
+        for file, entries in self.lang.items():
+            lines = [f"0:{file}"]
+            for key, value in entries:
+                lines += [key, "", value]
+
+            path = self.root / "Locale" / "English" / f"{file}.lang"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes("\r\n".join(lines).encode("utf-16"))
+
+        # The stand-in deserializer only fingerprints the types file.
+        types.write_text(json.dumps({"version": 1, "classes": {}}))
+
+
+def _stat_rules(fx: Fixture):
+    fx.write("GameEffectRuleData/Base.xml", {
+        "m_tableName": b"Base",
+        "m_statVector": [float(i) for i in range(TABLE_SIZE)],
+    })
+    fx.write("GameEffectData/CanonicalStatEffects.xml", {"m_effectTemplates": [
+        {
+            "m_effectName": f"Effect{i}".encode(),
+            "m_effectCategory": b"Damage" if i % 2 else b"MaxHealth",
+            "m_statTableName": b"Base" if i % 3 else b"",
+        }
+        for i in range(EFFECTS)
+    ]})
+
+
+def _spells(fx: Fixture, count: int) -> list:
+    names = []
+    for i in range(count):
+        name = f"Spell{i}"
+        names.append(name.encode())
+        pips = {f"m_{school.decode().lower()}Pips": 0 for school in SCHOOLS[:6]}
+        fx.template(f"Spells/{name}.xml", {
+            "m_name": name.encode(),
+            "m_displayName": fx.string("Spells", f"Name{i}", f"Spell {i}"),
+            "m_description": fx.string("Spells", f"Desc{i}", f"Deals {100 + i} damage"),
+            "m_imageName": b"spell.dds",
+            "m_accuracy": 80,
+            "m_sMagicSchoolName": fx.random.choice(SCHOOLS),
+            "m_sTypeName": b"Damage",
+            "m_spellRank": {
+                "m_spellRank": 1 + i % 8,
+                "m_xPipSpell": False,
+                "m_shadowPips": 0,
+                "m_balancePips": 0,
+                **pips,
+            },
+            "m_effects": [{
+                "m_effectParam": 100 + i,
+                "m_sDamageType": fx.random.choice(SCHOOLS),
+                "m_numRounds": 0,
+                "m_effectList": [{"m_effectParam": 5, "m_sDamageType": b"Fire", "m_numRounds": 3}],
+            }],
+        })
+
+    return names
+
+
+def _talents(fx: Fixture) -> list:
+    names = []
+    for i in range(TALENTS):
+        name = f"Talent{i}"
+        names.append(name.encode())
+        fx.template(f"TalentData/{name}.xml", {
+            "m_talentName": name.encode(),
+            "m_displayName": fx.string("Talents", f"Talent{i}", f"Talent {i}"),
+        })
+
+    return names
+
+
+def _set_bonuses(fx: Fixture) -> list:
+    return [
+        fx.template(f"ObjectData/Sets/Set{i}.xml", {
+            "m_displayName": fx.string("Items", f"Set{i}", f"Set {i}"),
+            "m_behaviors": [],
+            "m_itemSetBonusDataList": [
+                {"m_numItemsToEquip": n, "m_equipEffectsGranted": [fx.stat_effect()]}
+                for n in (2, 3)
+            ],
+        })
+        for i in range(SET_BONUSES)
+    ]
+
+
+def _item(fx: Fixture, i: int, spells: list, talents: list, bonuses: list) -> dict:
+    effects = [fx.stat_effect() for _ in range(fx.random.randrange(2, 8))]
+    effects.append({"m_effectName": b"ProvideSpell", "m_spellName": fx.random.choice(spells), "m_numSpells": 1})
+    effects.append({"m_effectName": b"StartingPips", "m_pipsGiven": 1, "m_powerPipsGiven": 0})
+
+    behaviors = [None, {
+        "m_behaviorName": b"JewelSocketBehavior",
+        "m_jewelSockets": [{"m_bLockable": True, "m_socketType": "SocketType::TEAR"}],
+    }]
+    if i % 7 == 0:
+        behaviors.append({
+            "m_behaviorName": b"PetJewelBehavior",
+            "m_minPetLevel": 2,
+            "m_petTalentName": [fx.random.choice(talents)],
+        })
+    if i % 11 == 0:
+        behaviors.append({
+            "m_behaviorName": b"BasicDeckBehavior",
+            "m_maxSpells": 60,
+            "m_genericMaxInstances": 4,
+            "m_schoolMaxInstances": 6,
+            "m_primarySchoolName": fx.random.choice(SCHOOLS),
+            "m_maxTreasureCards": 20,
+            "m_maxArchmasteryPoints": 1.5,
+        })
+
+    return {
+        "m_templateID": 0,
+        "m_displayName": fx.string("Items", f"Item{i}", f"Item {i}"),
+        "m_itemSetBonusTemplateID": fx.random.choice(bonuses) if i % 4 == 0 else 0,
+        "m_rarity": "RarityType::RT_RARE",
+        "m_equipRequirements": {"m_requirements": [
+            {"m_applyNOT": False, "m_magicSchool": fx.random.choice(SCHOOLS)},
+            {"m_applyNOT": False, "m_magicSchool": b"", "m_operatorType": "OP_GREATER_THAN_EQ", "m_numericValue": float(i % 170)},
+        ]},
+        "m_adjectiveList": [fx.random.choice(ADJECTIVES), b"FLAG_NoAuction"],
+        "m_behaviors": behaviors,
+        "m_equipEffects": effects,
+    }
+
+
+def _mob(fx: Fixture, i: int) -> dict:
+    return {
+        "m_templateID": 0,
+        "m_displayName": fx.string("Mobs", f"Mob{i}", f"Mob {i}"),
+        "m_aggroSound": b"aggro.wav",
+        "m_behaviors": [
+            {"m_behaviorName": b"DuelistBehavior"},
+            {
+                "m_behaviorName": b"NPCBehavior",
+                "m_bossMob": i % 5 == 0,
+                "m_fIntelligence": 0.5,
+                "m_fSelfishFactor": 0.25,
+                "m_nAggressiveFactor": 3,
+                "m_nLevel": 1 + i % 170,
+                "m_nStartingHealth": 500 + i,
+                "m_schoolOfFocus": fx.random.choice(SCHOOLS),
+                "m_secondarySchoolOfFocus": b"None",
+                "m_maxShadowPips": 0,
+                "m_baseEffects": [fx.stat_effect()],
+            },
+        ],
+    }
+
+
+# Writes a Root/ tree shaped like the game's, with roughly `templates`
+# ObjectData files split between items, mobs and templates wizdb skips.
+def generate(root: Path, types: Path, templates: int, seed: int = 1):
+    fx = Fixture(root, seed)
+
+    _stat_rules(fx)
+    spells = _spells(fx, max(templates // 10, 10))
+    talents = _talents(fx)
+    bonuses = _set_bonuses(fx)
+
+    items = templates * 5 // 10
+    mobs = templates * 2 // 10
+    for i in range(items):
+        fx.template(f"ObjectData/Items/Item{i}.xml", _item(fx, i, spells, talents, bonuses))
+    for i in range(mobs):
+        fx.template(f"ObjectData/Mobs/Mob{i}.xml", _mob(fx, i))
+    for i in range(templates - items - mobs):
+        fx.template(f"ObjectData/Other/Other{i}.xml", {
+            "m_templateID": 0,
+            "m_displayName": b"",
+            "m_behaviors": [],
+            "m_data": list(range(50)),
+        })
+
+    fx.save(types)
@@ -0,0 +1,27 @@
+import marshal
+from pathlib import Path
+
+from wizdb.deserializer import Deserializer
+
+
+class StandInError(Exception):
+    pass
+
+
+# Pure-Python replacement for the kobold decoder. Fixture templates are
+# plain marshalled dicts, which is the same shape kobold hands back.
+class StandInDeserializer(Deserializer):
+    DecodeError = StandInError
+
+    @staticmethod
+    def make(types_path: Path, cache_path: Path = None):
+        de = StandInDeserializer()
+        de.attach_cache(cache_path, types_path)
+
+        return de
+
+    def decode(self, data: bytes) -> dict:
+        try:
+            return marshal.loads(data)
+        except (EOFError, ValueError, TypeError) as err:
+            raise StandInError(str(err)) from err
@@ -0,0 +1,92 @@
+import marshal
+from pathlib import Path
+import sqlite3
+from struct import Struct
+import zlib
+
+import pytest
+
+from benchmarks.fixture import generate
+from benchmarks.standin import StandInDeserializer
+from wizdb.__main__ import deserialize_files
+from wizdb.db import BulkWriter, build_db
+from wizdb.incremental import record_build
+from wizdb.state import State
+from wizdb.template_index import TemplateIndex
+
+_WAD_HEADER = Struct("<5sIIB")
+_WAD_ENTRY = Struct("<III?II")
+
+# Tables whose first column is an autoincrement id that depends on insert order.
+AUTOINCREMENT = {"item_stats", "set_stats", "mob_stats", "pet_talents", "spell_effects", "effects"}
+
+
+@pytest.fixture
+def game(tmp_path: Path):
+    root = tmp_path / "Root"
+    types = tmp_path / "types.json"
+    generate(root, types, 200)
+
+    return root, types
+
+
+def make_state(root: Path, types: Path, **kwargs) -> State:
+    return State(root, types, make_deserializer=StandInDeserializer.make, **kwargs)
+
+
+def build(state: State, path: Path, index: TemplateIndex = None, jobs: int = 1):
+    items, mobs = deserialize_files(state, jobs, index)
+    with BulkWriter(path) as db:
+        item_ids, mob_ids = build_db(state, items, mobs, db)
+        record_build(db.cursor(), state, item_ids, mob_ids)
+
+
+# Every row of every data table, ignoring insert order.
+def dump(path: Path) -> dict:
+    db = sqlite3.connect(str(path))
+    tables = [
+        name for (name,) in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        if not name.startswith(("build_", "sqlite_"))
+    ]
+
+    rows = {}
+    for table in tables:
+        data = db.execute(f"SELECT * FROM {table}").fetchall()
+        if table in AUTOINCREMENT:
+            data = [row[1:] for row in data]
+        rows[table] = sorted(data, key=repr)
+
+    db.close()
+    return rows
+
+
+def read_template(root: Path, name: str) -> dict:
+    return marshal.loads((root / name).read_bytes()[4:])
+
+
+def write_template(root: Path, name: str, obj: dict):
+    (root / name).write_bytes(b"BINd" + marshal.dumps(obj))
+
+
+# Packs a directory into a KIWAD archive, compressing every other file.
+def pack_wad(root: Path, out: Path):
+    files = sorted(p for p in root.rglob("*") if p.is_file())
+
+    names = []
+    blobs = []
+    for i, path in enumerate(files):
+        data = path.read_bytes()
+        compressed = i % 2 == 0
+        names.append(path.relative_to(root).as_posix().encode() + b"\0")
+        blobs.append((len(data), zlib.compress(data) if compressed else data, compressed, zlib.crc32(data)))
+
+    offset = _WAD_HEADER.size + sum(_WAD_ENTRY.size + len(name) for name in names)
+    table = []
+    for name, (size, blob, compressed, crc) in zip(names, blobs):
+        table.append(_WAD_ENTRY.pack(offset, size, len(blob), compressed, crc, len(name)) + name)
+        offset += len(blob)
+
+    with open(out, "wb") as f:
+        f.write(_WAD_HEADER.pack(b"KIWAD", 2, len(files), 0))
+        f.writelines(table)
+        f.writelines(blob for _, blob, _, _ in blobs)
@@ -0,0 +1,40 @@
+import sqlite3
+
+from wizdb.db import effect_rows
+from wizdb.query import load_spell_effect_blobs, load_spell_effects
+from wizdb.query.blobs import unpack_int_blob
+from wizdb.utils import pack_int_blob
+
+from .conftest import build, make_state
+
+
+def test_int_blob_round_trip():
+    for data in ([], [7], list(range(-100, 155)), [2**31 - 1, -2**31]):
+        blob = pack_int_blob(data)
+        assert blob[0] == len(data)
+        assert list(unpack_int_blob(blob)) == data
+
+
+def test_long_effect_lists_have_no_blob(game):
+    root, types = game
+    state = make_state(root, types)
+    template, spell = next(iter(state.spells.cache.items()))
+    spell.effect_params = list(range(300))
+
+    kinds = [kind for _, kind, _ in effect_rows([(template, spell)])]
+    assert kinds == [2, 3]
+
+
+def test_effect_blobs_match_rows(game, tmp_path):
+    root, types = game
+    build(make_state(root, types), tmp_path / "items.db")
+
+    db = sqlite3.connect(str(tmp_path / "items.db"))
+    templates = [t for (t,) in db.execute("SELECT template_id FROM spells")]
+    blobs = load_spell_effect_blobs(db, templates)
+    rows = load_spell_effects(db, templates)
+    db.close()
+
+    assert templates
+    for template in templates:
+        assert {name: list(values) for name, values in blobs[template].items()} == rows[template]
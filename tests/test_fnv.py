@@ -0,0 +1,35 @@
+import random
+
+import pytest
+
+from wizdb import utils
+from wizdb.utils import fnv_1a, fnv_1a_many
+
+
+def _keys(count: int) -> list:
+    rng = random.Random(7)
+    keys = [b"", b"a", "Items_Item1".encode(), "Spells_Näme".encode(), bytes(range(256))]
+    keys += [bytes(rng.randrange(256) for _ in range(rng.randrange(40))) for _ in range(count)]
+    return keys
+
+
+def test_known_values():
+    # Reference 64-bit FNV-1a hashes, shifted right by one as the game does.
+    assert fnv_1a(b"") == 0xCBF29CE484222325 >> 1
+    assert fnv_1a(b"a") == 0xAF63DC4C8601EC8C >> 1
+    assert fnv_1a("foobar") == 0x85944171F73967E8 >> 1
+
+
+def test_many_matches_scalar():
+    keys = _keys(10)
+    assert fnv_1a_many(keys) == [fnv_1a(k) for k in keys]
+    assert fnv_1a_many(k.decode("latin-1") for k in keys[:3]) == [fnv_1a(k) for k in keys[:3]]
+
+
+def test_vectorized_matches_scalar():
+    pytest.importorskip("numpy")
+
+    keys = _keys(500)
+    assert utils._fnv_1a_vectorized(keys) == [utils._fnv_1a(k) for k in keys]
+    assert utils._fnv_1a_vectorized([]) == []
+    assert fnv_1a_many(keys) == [utils._fnv_1a(k) for k in keys]
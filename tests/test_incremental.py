@@ -0,0 +1,91 @@
+import sqlite3
+
+from wizdb.__main__ import deserialize_files
+from wizdb.incremental import update_db
+from wizdb.template_index import OTHER, TemplateIndex
+from wizdb.utils import fingerprint
+
+from .conftest import build, dump, make_state, read_template, write_template
+
+
+def _update(root, types, path, index: TemplateIndex) -> bool:
+    state = make_state(root, types)
+    db = sqlite3.connect(str(path))
+    try:
+        return update_db(state, db, lambda files: deserialize_files(state, 1, index, files), index)
+    finally:
+        db.close()
+
+
+def _drop_manifest_entry(root, name: str):
+    manifest = read_template(root, "TemplateManifest.xml")
+    manifest["m_serializedTemplates"] = [
+        e for e in manifest["m_serializedTemplates"] if e["m_filename"] != name.encode()
+    ]
+    write_template(root, "TemplateManifest.xml", manifest)
+    (root / name).unlink()
+
+
+def _drop_lang_entry(root, file: str, key: str):
+    path = root / "Locale" / "English" / f"{file}.lang"
+    header, *lines = path.read_bytes().decode("utf-16").split("\r\n")
+    entries = [lines[i:i + 3] for i in range(0, len(lines), 3)]
+    kept = [line for entry in entries if entry[0] != key for line in entry]
+    path.write_bytes("\r\n".join([header, *kept]).encode("utf-16"))
+
+
+def _patch(root):
+    item = read_template(root, "ObjectData/Items/Item3.xml")
+    item["m_equipEffects"][0]["m_lookupIndex"] = 77
+    write_template(root, "ObjectData/Items/Item3.xml", item)
+
+    _drop_manifest_entry(root, "ObjectData/Items/Item4.xml")
+    _drop_lang_entry(root, "Items", "Item4")
+
+    mob = read_template(root, "ObjectData/Mobs/Mob2.xml")
+    mob["m_behaviors"][1]["m_nStartingHealth"] = 9
+    write_template(root, "ObjectData/Mobs/Mob2.xml", mob)
+
+
+def test_update_matches_full_build(game, tmp_path):
+    root, types = game
+    index = TemplateIndex()
+    build(make_state(root, types), tmp_path / "patched.db", index)
+
+    _patch(root)
+    assert _update(root, types, tmp_path / "patched.db", index)
+
+    build(make_state(root, types), tmp_path / "full.db")
+    assert dump(tmp_path / "patched.db") == dump(tmp_path / "full.db")
+
+
+def test_update_prunes_removed_locale(game, tmp_path):
+    root, types = game
+    index = TemplateIndex()
+    build(make_state(root, types), tmp_path / "items.db", index)
+
+    _patch(root)
+    assert _update(root, types, tmp_path / "items.db", index)
+
+    db = sqlite3.connect(str(tmp_path / "items.db"))
+    names = {data for (data,) in db.execute("SELECT data FROM locale_en")}
+    db.close()
+    assert "Item 4" not in names and "Item 3" in names
+
+
+def test_update_drops_rows_of_templates_known_as_other(game, tmp_path):
+    root, types = game
+    index = TemplateIndex()
+    build(make_state(root, types), tmp_path / "patched.db", index)
+
+    name = "ObjectData/Items/Item5.xml"
+    item = read_template(root, name)
+    item["m_adjectiveList"] = []
+    write_template(root, name, item)
+
+    # Some other run already classified the new contents.
+    index.record(name, fingerprint((root / name).read_bytes()), OTHER)
+    assert _update(root, types, tmp_path / "patched.db", index)
+
+    build(make_state(root, types), tmp_path / "full.db")
+    assert dump(tmp_path / "patched.db") == dump(tmp_path / "full.db")
@@ -0,0 +1,131 @@
+from wizdb.lang_files import LangCache, _parse_lang_file
+from wizdb.locale_index import LocaleIndex
+from wizdb.utils import fnv_1a
+
+from .conftest import build, dump, make_state
+
+
+def _load_all(cache: LangCache):
+    for path in sorted(cache.locale.glob("*.lang")):
+        cache.add_file(path)
+
+
+def test_round_trip(game, tmp_path):
+    root, _ = game
+    locale = root / "Locale" / "English"
+    index_path = tmp_path / "locale_index.bin"
+
+    cache = LangCache(locale, index_path)
+    _load_all(cache)
+    cache.save_index(index_path)
+
+    index = LocaleIndex(index_path)
+    for path in sorted(locale.glob("*.lang")):
+        assert index.covers(path)
+        mapping = _parse_lang_file(path.read_bytes())
+        assert dict(index.entries(path.name)) == {fnv_1a(k.encode()): v for k, v in mapping.items()}
+        for key, value in mapping.items():
+            assert index.get(path.name, fnv_1a(key.encode())) == value
+        assert index.get(path.name, fnv_1a(b"missing")) is None
+    index.close()
+
+
+def test_indexed_cache_matches_parsed(game, tmp_path):
+    root, _ = game
+    locale = root / "Locale" / "English"
+    index_path = tmp_path / "locale_index.bin"
+
+    parsed = LangCache(locale)
+    _load_all(parsed)
+    parsed.save_index(index_path)
+
+    indexed = LangCache(locale, index_path)
+    _load_all(indexed)
+    assert indexed.parsed == {} and indexed.lookup == {}
+    assert sorted(indexed.items()) == sorted(parsed.items())
+    for key, value in parsed.items():
+        assert indexed.get(key) == value
+
+
+def test_broken_index_is_ignored(game, tmp_path):
+    root, _ = game
+    locale = root / "Locale" / "English"
+    index_path = tmp_path / "locale_index.bin"
+
+    cache = LangCache(locale, index_path)
+    _load_all(cache)
+    cache.save_index(index_path)
+    data = index_path.read_bytes()
+
+    for broken in (data[:5], data[:len(data) // 2], b""):
+        index_path.write_bytes(broken)
+        index = LocaleIndex(index_path)
+        assert index.sources == {}
+        index.close()
+
+        cache = LangCache(locale, index_path)
+        _load_all(cache)
+        assert cache.indexed == set() and len(cache.parsed) == len(list(locale.glob("*.lang")))
+
+
+def test_found_entries_are_kept(game, tmp_path):
+    root, _ = game
+    locale = root / "Locale" / "English"
+    index_path = tmp_path / "locale_index.bin"
+
+    cache = LangCache(locale, index_path)
+    _load_all(cache)
+    cache.save_index(index_path)
+
+    path = sorted(locale.glob("*.lang"))[0]
+    key, value = next(iter(_parse_lang_file(path.read_bytes()).items()))
+
+    cache = LangCache(locale, index_path)
+    key_hash = cache.find_entry(key.encode())
+    assert cache.lookup == {key_hash: value}
+    assert cache.get(key_hash) == value
+
+
+def test_build_with_index_matches_without(game, tmp_path):
+    root, types = game
+    index_path = tmp_path / "locale_index.bin"
+
+    build(make_state(root, types), tmp_path / "plain.db")
+
+    state = make_state(root, types, locale_index=index_path)
+    build(state, tmp_path / "first.db")
+    state.cache.save_index(index_path)
+
+    state = make_state(root, types, locale_index=index_path)
+    build(state, tmp_path / "indexed.db")
+    assert state.cache.parsed == {}
+
+    assert dump(tmp_path / "first.db") == dump(tmp_path / "plain.db")
+    assert dump(tmp_path / "indexed.db") == dump(tmp_path / "plain.db")
+
+
+def test_unchanged_index_is_not_rewritten(game, tmp_path):
+    root, _ = game
+    locale = root / "Locale" / "English"
+    index_path = tmp_path / "locale_index.bin"
+
+    cache = LangCache(locale, index_path)
+    _load_all(cache)
+    cache.save_index(index_path)
+    written = index_path.stat().st_mtime_ns
+
+    cache = LangCache(locale, index_path)
+    _load_all(cache)
+    cache.save_index(index_path)
+    assert index_path.stat().st_mtime_ns == written
+
+    # A changed lang file is parsed again and the index rewritten.
+    path = sorted(locale.glob("*.lang"))[0]
+    path.write_bytes(path.read_bytes() + "\r\n".encode("utf-16-le"))
+    cache = LangCache(locale, index_path)
+    _load_all(cache)
+    assert path.name in cache.parsed
+    cache.save_index(index_path)
+    index = LocaleIndex(index_path)
+    assert index.covers(path)
+    index.close()
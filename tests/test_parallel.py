@@ -0,0 +1,13 @@
+import pytest
+
+from .conftest import build, dump, make_state
+
+
+@pytest.mark.parametrize("lazy_spells", [False, True])
+def test_parallel_matches_serial(game, tmp_path, lazy_spells):
+    root, types = game
+
+    build(make_state(root, types, lazy_spells=lazy_spells), tmp_path / "serial.db")
+    build(make_state(root, types, lazy_spells=lazy_spells), tmp_path / "parallel.db", jobs=2)
+
+    assert dump(tmp_path / "parallel.db") == dump(tmp_path / "serial.db")
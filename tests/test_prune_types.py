@@ -0,0 +1,62 @@
+from wizdb.incremental import input_fingerprint
+from wizdb.prune_types import snapshot_path, type_closure, types_fingerprint, write_snapshot
+from wizdb.utils import fingerprint
+
+from .conftest import make_state
+
+
+def _class(name: str, bases: list, properties: dict) -> dict:
+    return {
+        "name": f"class {name}",
+        "bases": [f"class {base}" for base in bases],
+        "properties": {prop: {"type": kind} for prop, kind in properties.items()},
+    }
+
+
+CLASSES = {
+    "1": _class("PropertyClass", [], {}),
+    "2": _class("Template", ["PropertyClass"], {"m_id": "unsigned int"}),
+    "3": _class("ItemTemplate", ["Template"], {"m_id": "unsigned int", "m_effects": "class SharedPointer<class Effect>"}),
+    "4": _class("MobTemplate", ["Template"], {"m_id": "unsigned int", "m_rank": "int"}),
+    "5": _class("Effect", ["PropertyClass"], {"m_name": "std::string"}),
+    "6": _class("StatEffect", ["Effect"], {"m_name": "std::string", "m_value": "float"}),
+    "7": _class("Unrelated", ["PropertyClass"], {"m_other": "int"}),
+}
+
+
+def test_closure_keeps_subclasses():
+    kept, unmatched = type_closure(CLASSES, [frozenset({"m_id"}), frozenset({"m_missing"})])
+
+    assert unmatched == 1
+    # Template's subclasses and the property classes they hold, but not
+    # everything derived from the PropertyClass base.
+    assert sorted(kept) == ["1", "2", "3", "4", "5", "6"]
+
+
+def test_snapshot_keyed_by_manifest(tmp_path):
+    types = tmp_path / "types.json"
+    types.write_text("{}")
+
+    first = snapshot_path(types, b"manifest")
+    assert first == snapshot_path(types, b"manifest")
+    assert first != snapshot_path(types, b"patched manifest")
+
+    types.write_text('{"classes": {}}')
+    assert first != snapshot_path(types, b"manifest")
+
+
+def test_snapshot_keeps_source_fingerprint(game, tmp_path):
+    root, types = game
+    manifest = (root / "TemplateManifest.xml").read_bytes()
+    snapshot, unmatched = write_snapshot(types, manifest, [])
+    assert unmatched == 0 and snapshot == snapshot_path(types, manifest)
+
+    # The template index, incremental builds and the decode cache all go
+    # by this, so switching to the snapshot keeps what they know.
+    assert types_fingerprint(snapshot) == types_fingerprint(types) == fingerprint(types.read_bytes())
+
+    cache = tmp_path / "decode_cache.db"
+    full = make_state(root, types, decode_cache=cache)
+    pruned = make_state(root, snapshot, decode_cache=cache)
+    assert input_fingerprint(pruned) == input_fingerprint(full)
+    assert pruned.de.cache.salt == full.de.cache.salt
@@ -0,0 +1,53 @@
+from benchmarks.standin import StandInDeserializer
+
+from .conftest import make_state, read_template, write_template
+
+
+def test_lazy_lookup_by_name(game):
+    root, types = game
+    spell = read_template(root, "Spells/Spell3.xml")
+    spell["m_name"] = b"Renamed"
+    write_template(root, "Spells/Spell3.xml", spell)
+
+    state = make_state(root, types, lazy_spells=True)
+    spells = state.spells
+    template = state.file_to_id["Spells/Spell3.xml"]
+
+    assert spells.get(state, "Spell1") == state.file_to_id["Spells/Spell1.xml"]
+    assert spells.get(state, "Unknown") is None
+    # Looking for an unknown name only notes the other spells' names.
+    assert spells.decoded == {} and spells.pending == {}
+    assert "Spell2" in spells.located
+
+    assert spells.get(state, "Renamed") == template
+    assert spells.cache[template].real_name == b"Renamed"
+    assert spells.get(state, "Spell3") is None
+    assert spells.missing == {"Unknown", "Spell3"}
+
+
+def test_spell_names_carry_over(game, monkeypatch):
+    root, types = game
+    decodes = []
+    decode = StandInDeserializer.decode
+    monkeypatch.setattr(StandInDeserializer, "decode", lambda self, data: decodes.append(1) or decode(self, data))
+
+    state = make_state(root, types, lazy_spells=True)
+    assert state.spells.get(state, "Unknown") is None
+    names = state.spells.names
+    assert len(names) == len([f for f in state.file_to_id if f.startswith("Spells/")])
+
+    # With the names of the last build, a miss decodes nothing.
+    state = make_state(root, types, lazy_spells=True, spell_names=names)
+    decodes.clear()
+    assert state.spells.get(state, "Unknown") is None
+    assert decodes == []
+
+    # A changed spell file is decoded again to learn its new name.
+    spell = read_template(root, "Spells/Spell4.xml")
+    spell["m_name"] = b"Renamed"
+    write_template(root, "Spells/Spell4.xml", spell)
+
+    state = make_state(root, types, lazy_spells=True, spell_names=names)
+    decodes.clear()
+    assert state.spells.get(state, "Renamed") == state.file_to_id["Spells/Spell4.xml"]
+    assert len(decodes) == 2
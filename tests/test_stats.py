@@ -0,0 +1,18 @@
+from struct import pack, unpack
+
+from wizdb.query import unpack_stat_value
+
+from .conftest import make_state
+
+
+def test_percent_amounts_are_rounded(game):
+    root, types = game
+    rules = make_state(root, types).stat_rules
+    name, effect = next((name, effect) for name, effect in rules.effects.items() if effect.percent)
+
+    # Stat tables hold float32s; 0.15 is 0.150000006 there.
+    effect.vector = [unpack("<f", pack("<f", v))[0] for v in (0.15, 0.07, 0.125)]
+    for idx, amount in enumerate((15.0, 7.0, 12.5)):
+        stat = rules._translate_stat(name, idx)
+        assert stat.amount == amount
+        assert unpack_stat_value(stat.value) == stat.amount
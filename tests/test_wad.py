@@ -0,0 +1,41 @@
+from wizdb.wad import WadPath
+
+from .conftest import build, dump, make_state, pack_wad
+
+
+def test_files_round_trip(game, tmp_path):
+    root, _ = game
+    pack_wad(root, tmp_path / "Root.wad")
+    wad = WadPath(tmp_path / "Root.wad")
+
+    files = sorted(p for p in root.rglob("*") if p.is_file())
+    assert len(wad.wad.entries) == len(files)
+    for path in files:
+        assert bytes((wad / path.relative_to(root).as_posix()).read_bytes()) == path.read_bytes()
+
+
+def test_paths(game, tmp_path):
+    root, _ = game
+    pack_wad(root, tmp_path / "Root.wad")
+    wad = WadPath(tmp_path / "Root.wad")
+
+    spells = wad / "Spells"
+    assert spells.is_dir() and not spells.is_file()
+    assert (spells / "Spell0.xml").is_file()
+    assert not (spells / "Missing.xml").exists()
+    assert (spells / "Spell0.xml").relative_to(wad) == "Spells/Spell0.xml"
+    assert (wad / "Locale/English/Items").with_suffix(".lang").is_file()
+
+    assert sorted(p.path for p in wad.glob("**/*.lang")) == sorted(
+        p.relative_to(root).as_posix() for p in root.rglob("*.lang")
+    )
+    assert list((wad / "Locale").glob("*.lang")) == []
+
+
+def test_build_from_archive_matches_directory(game, tmp_path):
+    root, types = game
+    pack_wad(root, tmp_path / "Root.wad")
+
+    build(make_state(root, types), tmp_path / "dir.db")
+    build(make_state(WadPath(tmp_path / "Root.wad"), types), tmp_path / "wad.db")
+    assert dump(tmp_path / "wad.db") == dump(tmp_path / "dir.db")
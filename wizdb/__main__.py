@@ -1,75 +1,309 @@
+from argparse import ArgumentParser
 from pathlib import Path
 import sqlite3
 
-from kobold_py import KoboldError
-from kobold_py import op as kobold
-
-from .db import build_db
-from .item import Item, is_item_template
-from .mob import Mob, is_mob_template
+from .db import BulkWriter, stream_db
+from .decode_cache import DEFAULT_MAX_BYTES
+from .export import SINKS, export
+from .incremental import record_build, update_db
+from .object_data import deserialize_templates, find_template_files, iter_templates
+from .parallel import deserialize_parallel, iter_parallel
+from .prefetch import DEFAULT_DEPTH, DEFAULT_READ_AHEAD, DEFAULT_THREADS, Prefetcher
+from .profile import NULL_PROFILER, Profiler
+from .prune_types import snapshot_path, types_fingerprint, write_snapshot
 from .state import State
+from .template_index import TemplateIndex
+from .wad import WadPath
 
 ROOT = Path(__file__).parent.parent
 
 ITEMS_DB = ROOT / "items.db"
+OUTPUTS = {
+    "sqlite": ITEMS_DB,
+    "columnar": ROOT / "items.columns",
+    "ndjson": ROOT / "items.ndjson",
+}
+OUTPUT_NAMES = {"sqlite": "Database", "columnar": "Columnar export", "ndjson": "NDJSON export"}
+TEMPLATE_INDEX = ROOT / "template_index.json"
+DECODE_CACHE = ROOT / "decode_cache.db"
+LOCALE_INDEX = ROOT / "locale_index.bin"
 ROOT_WAD = ROOT / "Root"
+ROOT_WAD_ARCHIVE = ROOT / "Root.wad"
 TYPES = ROOT / "types.json"
 LOCALE = ROOT_WAD / "Locale" / "English"
 STAT_EFFECTS = ROOT_WAD / "GameEffectData" / "CanonicalStatEffects.xml"
 STAT_RULES = ROOT_WAD / "GameEffectRuleData"
 
 
-def read_item_template(de: kobold.BinaryDeserializer, file: Path) -> dict:
-    try:
-        obj = de.deserialize(file.read_bytes())
-    except KoboldError:
-        return None
+def all_template_files(state: State, index: TemplateIndex = None) -> list:
+    files = find_template_files(state)
+    if index is not None:
+        index.retain(files)
 
-    if not is_item_template(obj):
-        return None
+    return files
 
-    return obj
 
+def deserialize_files(state: State, jobs: int = 1, index: TemplateIndex = None, files: list = None):
+    if files is None:
+        files = all_template_files(state, index)
 
-def read_mob_template(de: kobold.BinaryDeserializer, file: Path) -> dict:
-    try:
-        obj = de.deserialize(file.read_bytes())
-    except KoboldError:
-        return None
+    if jobs > 1:
+        return deserialize_parallel(state, files, jobs, index)
+    else:
+        return deserialize_templates(state, files, index)
 
-    if not is_mob_template(obj):
-        return None
 
-    return obj
+def stream_files(state: State, jobs: int = 1, index: TemplateIndex = None):
+    files = all_template_files(state, index)
 
+    if jobs > 1:
+        return iter_parallel(state, files, jobs, index)
+    else:
+        return iter_templates(state, files, index)
 
-def deserialize_files(state: State):
-    items = []
-    mobs = []
-    for file in (ROOT_WAD / "ObjectData").glob("**/*.xml"):
-        if obj := read_item_template(state.de, file):
-            item = Item(state, obj)
-            items.append(item)
 
-        elif obj := read_mob_template(state.de, file):
-            mob = Mob(state, obj)
-            mobs.append(mob)
+def parse_args():
+    parser = ArgumentParser(prog="wizdb", description="Builds an SQLite database of items directly from game files.")
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes decoding ObjectData, set bonus and talent templates (default: 1)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("sqlite", *SINKS),
+        default="sqlite",
+        help="write an SQLite database, per-column binary arrays or newline-delimited JSON (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        type=Path,
+        help="where to write the output (default: items.db, items.columns or items.ndjson)",
+    )
+    parser.add_argument(
+        "--fts",
+        action="store_true",
+        help="add a trigram full-text index over item, mob, spell and set bonus names",
+    )
+    parser.add_argument(
+        "--compact-locale",
+        action="store_true",
+        help="only store locale strings the database refers to, each distinct string once",
+    )
+    parser.add_argument(
+        "--no-effect-blobs",
+        dest="effect_blobs",
+        action="store_false",
+        help="leave the effects table of packed int blobs empty, spell_effects holds the same data",
+    )
+    parser.add_argument(
+        "--wad",
+        type=Path,
+        help="read game files straight from this Root.wad instead of an unpacked Root/ directory",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=DEFAULT_THREADS,
+        help="threads reading template files ahead of the decoder, 0 to read inline (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--prefetch-depth",
+        type=int,
+        default=DEFAULT_DEPTH,
+        help="most template files read ahead at once (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--prefetch-size",
+        type=int,
+        default=DEFAULT_READ_AHEAD >> 20,
+        help="most MiB of template data read ahead at once (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--decode-cache",
+        type=Path,
+        nargs="?",
+        const=DECODE_CACHE,
+        help=f"reuse decoded templates across builds from an on-disk cache (default: {DECODE_CACHE.name})",
+    )
+    parser.add_argument(
+        "--decode-cache-size",
+        type=int,
+        default=DEFAULT_MAX_BYTES >> 20,
+        help="size limit of the decode cache in MiB (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="update an existing items.db with only the templates that changed since it was built",
+    )
+    parser.add_argument(
+        "--referenced-spells",
+        action="store_true",
+        help="only decode and store spells that items or mobs refer to, always rebuilds with --incremental",
+    )
+    parser.add_argument(
+        "--prune-types",
+        action="store_true",
+        help="decode with a copy of types.json pruned to the classes wizdb uses, made by the first full build for each types.json",
+    )
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="ignore the cached template classification and locale indexes and rebuild them",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report time, throughput, memory and decode failures per build stage",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="number of slowest templates to list in the profile (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profile-json",
+        type=Path,
+        help="also write the profile as JSON to this file (implies --profile)",
+    )
 
-    return items, mobs
+    args = parser.parse_args()
+    if args.incremental and args.format != "sqlite":
+        parser.error("--incremental only works with --format sqlite")
+    if args.fts and args.format != "sqlite":
+        parser.error("--fts only works with --format sqlite")
+    if args.compact_locale and args.format != "sqlite":
+        parser.error("--compact-locale only works with --format sqlite")
+    if args.output is None:
+        args.output = OUTPUTS[args.format]
 
+    return args
 
-def main():
-    state = State(ROOT_WAD, TYPES)
-    items, mobs = deserialize_files(state)
 
-    if ITEMS_DB.exists():
-        ITEMS_DB.unlink()
+def find_root(args):
+    if args.wad is not None:
+        return WadPath(args.wad)
+
+    # Fall back to the archive itself when it was never unpacked.
+    if not ROOT_WAD.exists() and ROOT_WAD_ARCHIVE.exists():
+        return WadPath(ROOT_WAD_ARCHIVE)
+
+    return ROOT_WAD
+
+
+def close_decode_cache(state: State, args):
+    if cache := state.de.cache:
+        cache.evict(args.decode_cache_size << 20)
+        cache.close()
+        state.de.cache = None
+
 
-    db = sqlite3.connect(str(ITEMS_DB))
-    build_db(state, items, mobs, db)
+def update(args, state: State, index: TemplateIndex) -> bool:
+    db = sqlite3.connect(str(args.output))
+    with state.profiler.stage("update_db"):
+        updated = update_db(state, db, lambda files: deserialize_files(state, args.jobs, index, files), index, args.fts)
     db.close()
 
-    print(f"Success! Database written to {ITEMS_DB.absolute()}")
+    return updated
+
+
+def rebuild(args, state: State, index: TemplateIndex):
+    if args.format != "sqlite":
+        with state.profiler.stage("objectdata"):
+            items, mobs = deserialize_files(state, args.jobs, index)
+
+        with state.profiler.stage("export"):
+            with SINKS[args.format](args.output) as sink:
+                export(state, items, mobs, sink)
+        return
+
+    # Rows are written while templates are still being decoded.
+    with state.profiler.stage("objectdata + build_db"):
+        with BulkWriter(args.output) as db:
+            entities = stream_files(state, args.jobs, index)
+            item_ids, mob_ids = stream_db(state, entities, db, args.fts, args.compact_locale, args.effect_blobs)
+            record_build(db.cursor(), state, item_ids, mob_ids)
+
+
+def main():
+    args = parse_args()
+
+    if args.reindex:
+        LOCALE_INDEX.unlink(missing_ok=True)
+
+    # Without a snapshot for this types.json yet, this build collects
+    # what goes into one.
+    root = find_root(args)
+    types = TYPES
+    collect_shapes = False
+    if args.prune_types:
+        manifest = (root / "TemplateManifest.xml").read_bytes()
+        snapshot = snapshot_path(TYPES, manifest)
+        if args.reindex:
+            snapshot.unlink(missing_ok=True)
+
+        if snapshot.exists():
+            types = snapshot
+        else:
+            collect_shapes = True
+
+    types_digest = types_fingerprint(types)
+    index = TemplateIndex(types=types_digest) if args.reindex else TemplateIndex.load(TEMPLATE_INDEX, types_digest)
+
+    profiler = Profiler(args.profile_top) if args.profile or args.profile_json else NULL_PROFILER
+
+    with profiler.stage("state"):
+        prefetcher = Prefetcher(args.prefetch, args.prefetch_depth, args.prefetch_size << 20)
+        state = State(
+            root,
+            types,
+            args.decode_cache,
+            LOCALE_INDEX,
+            profiler,
+            lazy_spells=args.referenced_spells,
+            prefetcher=prefetcher,
+            jobs=args.jobs,
+            collect_shapes=collect_shapes,
+            spell_names=index.spell_names,
+        )
+
+    rebuilt = True
+    if args.incremental and args.output.exists():
+        if update(args, state, index):
+            rebuilt = False
+            message = f"Success! Database updated at {args.output.absolute()}"
+        else:
+            print("Existing database can't be updated in place, rebuilding it")
+            rebuild(args, state, index)
+            message = f"Success! {OUTPUT_NAMES[args.format]} written to {args.output.absolute()}"
+    else:
+        rebuild(args, state, index)
+        message = f"Success! {OUTPUT_NAMES[args.format]} written to {args.output.absolute()}"
+
+    # An in-place update only saw the templates that changed.
+    if collect_shapes and rebuilt:
+        path, unmatched = write_snapshot(TYPES, manifest, state.de.shapes)
+        if path is None:
+            print(f"Not pruning types: {unmatched} decoded object shapes match no class in {TYPES.name}")
+        else:
+            print(f"Pruned types written to {path.absolute()}")
+
+    if state.spells.lazy:
+        index.spell_names = state.spells.names
+    index.save(TEMPLATE_INDEX)
+    state.cache.save_index(LOCALE_INDEX)
+    close_decode_cache(state, args)
+    prefetcher.close()
+
+    if profiler.enabled:
+        print(profiler.report())
+        if args.profile_json is not None:
+            profiler.dump(args.profile_json)
+
+    print(message)
 
 
 if __name__ == "__main__":
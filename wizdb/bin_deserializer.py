@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from kobold_py import KoboldError
+from kobold_py import op as kobold
+
+from .deserializer import Deserializer
+
+
+class BinDeserializer(Deserializer, kobold.BinaryDeserializer):
+    DecodeError = KoboldError
+
+    @staticmethod
+    def make(types_path: Path, cache_path: Path = None):
+        opts = kobold.DeserializerOptions()
+        opts.flags = 1
+        opts.shallow = False
+        opts.skip_unknown_types = True
+
+        types_data = types_path.read_bytes()
+        types = kobold.TypeList(types_data.decode())
+
+        de = BinDeserializer(opts, types)
+        de.attach_cache(cache_path, types_path)
+
+        return de
+
+    def decode(self, data: bytes) -> dict:
+        return kobold.BinaryDeserializer.deserialize(self, data)
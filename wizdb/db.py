@@ -1,18 +1,42 @@
+from itertools import chain, zip_longest
+import os
+from pathlib import Path
+from queue import Queue
 import sqlite3
+from threading import Thread
 
+from .item import Item
 from .lang_files import LangCache
 from .set_bonus import SetBonusCache
 from .spell import SpellCache
 from .utils import pack_int_blob
 
-INIT_QUERIES = """CREATE TABLE locale_en (
+LOCALE_QUERY = """CREATE TABLE locale_en (
+    id   integer not null primary key,
+    data text not null
+);
+"""
+
+# Referenced-only locale with every distinct string stored once. The
+# locale_en view keeps queries against the plain layout working.
+COMPACT_LOCALE_QUERY = """CREATE TABLE locale_strings (
     id   integer not null primary key,
     data text not null
 );
 
-CREATE INDEX en_name_lookup ON locale_en(data);
+CREATE TABLE locale_keys (
+    id     integer not null primary key,
+    string integer not null,
+
+    foreign key(string) references locale_strings(id)
+);
+
+CREATE VIEW locale_en(id, data) AS
+    SELECT locale_keys.id, locale_strings.data
+    FROM locale_keys JOIN locale_strings ON locale_strings.id = locale_keys.string;
+"""
 
-CREATE TABLE set_bonuses (
+TABLE_QUERIES = """CREATE TABLE set_bonuses (
     id   integer not null primary key,
     name integer not null,
 
@@ -27,12 +51,12 @@ CREATE TABLE set_stats (
     kind           integer not null,
     a              integer,
     b              integer,
+    -- The stat amount for kind 1, which b holds as float bits.
+    value          real,
 
     foreign key(bonus_set) references set_bonuses(id)
 );
 
-CREATE INDEX set_stat_lookup ON set_stats(bonus_set);
-
 CREATE TABLE items (
     id                 integer not null primary key,
     name               integer not null,
@@ -67,12 +91,11 @@ CREATE TABLE item_stats (
     kind     integer not null,
     a        integer,
     b        integer,
+    value    real,
 
     foreign key(item) references items(id)
 );
 
-CREATE INDEX item_stat_lookup ON item_stats(item);
-
 CREATE TABLE pet_talents (
     id   integer not null primary key,
     item integer not null,
@@ -82,8 +105,6 @@ CREATE TABLE pet_talents (
     foreign key(name) references locale_en(id)
 );
 
-CREATE INDEX item_talent_lookup ON pet_talents(item);
-
 CREATE TABLE spells (
     id              integer not null primary key,
     template_id     integer not null,
@@ -109,6 +130,16 @@ CREATE TABLE spells (
     foreign key(name)        references locale_en(id)
 );
 
+CREATE TABLE spell_effects (
+    id          integer not null primary key,
+    spell       integer not null,
+    ordinal     integer not null,
+    param       integer,
+    damage_type integer,
+    rounds      integer
+);
+
+-- Packed copies of the spell_effects columns, only written on request.
 CREATE TABLE effects (
     id       integer not null primary key,
     spell    integer not null,
@@ -141,22 +172,58 @@ CREATE TABLE mob_stats (
     kind     integer not null,
     a        integer,
     b        integer,
+    value    real,
 
     foreign key(mob) references mobs(id)
 );
+
+-- Bookkeeping for incremental rebuilds.
+CREATE TABLE build_meta (
+    key   text not null primary key,
+    value text not null
+);
+
+CREATE TABLE build_templates (
+    kind integer not null,
+    file text not null,
+    id   integer not null,
+    hash text not null,
+
+    primary key(kind, file)
+);
 """
 
+# Created once all rows are in, so inserts don't have to maintain them.
+LOCALE_INDEX_QUERIES = (
+    "CREATE INDEX en_name_lookup ON locale_en(data)",
+)
+
+COMPACT_LOCALE_INDEX_QUERIES = (
+    "CREATE INDEX en_name_lookup ON locale_strings(data)",
+    "CREATE INDEX locale_key_lookup ON locale_keys(string)",
+)
+
+INDEX_QUERIES = (
+    "CREATE INDEX set_stat_lookup ON set_stats(bonus_set, kind)",
+    "CREATE INDEX set_stat_value_lookup ON set_stats(kind, a, value)",
 
-def convert_stat(stat):
-    match stat.kind:
-        case 1: return 1, stat.category, stat.value
-        case 2: return 2, stat.pips, stat.power_pips
-        case 3: return 3, stat.spell, stat.count
-        case 4: return 4, stat.spell, stat.desc_key.id
-        case 5: return 5, stat.multiplier, 0
-        case 6: return 6, stat.count, 0
+    "CREATE INDEX item_lookup ON items(kind, equip_school, equip_level)",
+    "CREATE INDEX item_bonus_lookup ON items(bonus_set)",
+    "CREATE INDEX item_stat_lookup ON item_stats(item, kind)",
+    "CREATE INDEX item_stat_value_lookup ON item_stats(kind, a, value)",
+    "CREATE INDEX item_talent_lookup ON pet_talents(item)",
 
-        case _: raise RuntimeError()
+    "CREATE INDEX spell_template_lookup ON spells(template_id)",
+    "CREATE INDEX spell_school_lookup ON spells(school, rank)",
+    "CREATE INDEX effect_lookup ON effects(spell, kind)",
+    "CREATE INDEX spell_effect_lookup ON spell_effects(spell, ordinal)",
+    "CREATE INDEX spell_effect_school_lookup ON spell_effects(damage_type, param)",
+    "CREATE INDEX spell_effect_param_lookup ON spell_effects(param)",
+
+    "CREATE INDEX mob_lookup ON mobs(rank, primary_school)",
+    "CREATE INDEX mob_stat_lookup ON mob_stats(mob, kind)",
+    "CREATE INDEX mob_stat_value_lookup ON mob_stats(kind, a, value)",
+)
 
 
 def convert_equip_reqs(reqs):
@@ -171,40 +238,345 @@ def convert_equip_reqs(reqs):
     return school, level
 
 
-def build_db(state, items, mobs, out):
-    mem = sqlite3.connect(":memory:")
-    cursor = mem.cursor()
+# Optional trigram index over everything a user might search for by name.
+# Rows are keyed by template ID, which is unique across entity kinds.
+NAME_SEARCH_QUERY = """CREATE VIRTUAL TABLE name_search USING fts5(
+    name,
+    description,
+    kind UNINDEXED,
+    tokenize = 'trigram'
+)"""
+
+FILL_NAME_SEARCH_QUERY = """INSERT INTO name_search(rowid, name, description, kind)
+SELECT items.id, name.data, NULL, 'item'
+    FROM items JOIN locale_en AS name ON name.id = items.name
+UNION ALL
+SELECT mobs.id, name.data, NULL, 'mob'
+    FROM mobs JOIN locale_en AS name ON name.id = mobs.name
+UNION ALL
+SELECT spells.template_id, name.data, description.data, 'spell'
+    FROM spells JOIN locale_en AS name ON name.id = spells.name
+    LEFT JOIN locale_en AS description ON description.id = spells.description
+UNION ALL
+SELECT set_bonuses.id, name.data, NULL, 'set_bonus'
+    FROM set_bonuses JOIN locale_en AS name ON name.id = set_bonuses.name"""
+
+
+# Tuning for a one-shot bulk load into a fresh file. Nothing needs to
+# survive a crash mid-build since the file only goes live once complete.
+BULK_PRAGMAS = (
+    "PRAGMA page_size = 8192",
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+)
+
+LOCALE_INSERT = "INSERT INTO locale_en(id, data) VALUES (?, ?)"
+LOCALE_STRING_INSERT = "INSERT INTO locale_strings(id, data) VALUES (?, ?)"
+LOCALE_KEY_INSERT = "INSERT INTO locale_keys(id, string) VALUES (?, ?)"
+SPELL_INSERT = "INSERT INTO spells(template_id,name,real_name,image,accuracy,school,description,form,rank,x_pips,shadow_pips,fire_pips,ice_pips,storm_pips,myth_pips,life_pips,death_pips,balance_pips) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+SPELL_EFFECT_INSERT = "INSERT INTO spell_effects(spell,ordinal,param,damage_type,rounds) VALUES(?,?,?,?,?)"
+EFFECT_INSERT = "INSERT INTO effects(spell,kind,list) VALUES(?,?,?)"
+SET_BONUS_INSERT = "INSERT INTO set_bonuses(id,name) VALUES(?,?)"
+SET_STAT_INSERT = "INSERT INTO set_stats(bonus_set,activate_count,kind,a,b,value) VALUES(?,?,?,?,?,?)"
+ITEM_INSERT = "INSERT INTO items(id,name,bonus_set,rarity,jewels,kind,extra_flags,equip_school,equip_level,min_pet_level,max_spells,max_copies,max_school_copies,deck_school,max_tcs,archmastery_points) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"
+ITEM_STAT_INSERT = "INSERT INTO item_stats(item,kind,a,b,value) VALUES (?,?,?,?,?)"
+PET_TALENT_INSERT = "INSERT INTO pet_talents (item,name) VALUES (?,?)"
+MOB_INSERT = "INSERT INTO mobs(id,name,is_boss,rank,hp,primary_school,secondary_school,is_shadow,intelligence,selfishness,aggressiveness) VALUES (?,?,?,?,?,?,?,?,?,?,?)"
+MOB_STAT_INSERT = "INSERT INTO mob_stats(mob,kind,a,b,value) VALUES (?,?,?,?,?)"
+
+WRITE_BATCH = 2048
+WRITE_QUEUE_DEPTH = 16
+
+# effects.list blobs store their length in one byte.
+MAX_BLOB_ENTRIES = 255
+
+
+class BulkWriter:
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp = path.with_name(path.name + ".tmp")
+        self.db = None
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.tmp.unlink(missing_ok=True)
+
+        # A streaming build hands the connection to its writer thread.
+        self.db = sqlite3.connect(str(self.tmp), isolation_level=None, check_same_thread=False)
+        for pragma in BULK_PRAGMAS:
+            self.db.execute(pragma)
+
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.db.close()
+            self.tmp.unlink(missing_ok=True)
+            return
+
+        if self.db.in_transaction:
+            self.db.execute("COMMIT")
+        self.db.close()
+
+        # Make sure the data is on disk before the new file replaces the
+        # old one, so readers only ever see a complete database.
+        with open(self.tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(self.tmp, self.path)
+
+
+# Owns the connection while a streaming build runs. Batches of rows come
+# in through a bounded queue, so SQLite writes overlap with decoding and
+# only `depth` batches can ever be waiting in memory.
+class WriterThread:
+    def __init__(self, db: sqlite3.Connection, depth: int = WRITE_QUEUE_DEPTH):
+        self.db = db
+        self.queue = Queue(depth)
+        self.error = None
+        self.thread = Thread(target=self._run, name="wizdb-writer", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while (job := self.queue.get()) is not None:
+            # Keep draining after a failure so the producer never blocks.
+            if self.error is None:
+                try:
+                    self.db.executemany(*job)
+                except BaseException as e:
+                    self.error = e
+
+    def put(self, query: str, rows: list):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((query, rows))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+# Groups rows per statement into fixed-size batches for the writer.
+class RowBatches:
+    def __init__(self, writer: WriterThread, size: int = WRITE_BATCH):
+        self.writer = writer
+        self.size = size
+        self.pending = {}
+
+    def add(self, query: str, rows):
+        batch = self.pending.setdefault(query, [])
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.size:
+                self.writer.put(query, batch)
+                batch = self.pending[query] = []
+
+    def flush(self):
+        for query, batch in self.pending.items():
+            if batch:
+                self.writer.put(query, batch)
+        self.pending.clear()
+
+
+def build_db(
+    state,
+    items,
+    mobs,
+    out: sqlite3.Connection,
+    search: bool = False,
+    compact_locale: bool = False,
+    effect_blobs: bool = True,
+):
+    return stream_db(state, chain(items, mobs), out, search, compact_locale, effect_blobs)
+
+
+# Writes items and mobs as they come out of `entities`, without ever
+# holding all of them. Spells, set bonuses and locale strings fill up as
+# templates refer to them, so those go in once the stream is exhausted.
+# Returns the item and mob template ids that were written.
+def stream_db(
+    state,
+    entities,
+    out: sqlite3.Connection,
+    search: bool = False,
+    compact_locale: bool = False,
+    effect_blobs: bool = True,
+) -> tuple:
+    cursor = out.cursor()
+
+    initialize(cursor, compact_locale)
+
+    cursor.execute("BEGIN")
+
+    item_ids = []
+    mob_ids = []
+    bonus_order = {}
+    refs = set()
+
+    writer = WriterThread(out)
+    try:
+        batches = RowBatches(writer)
+        for entity in entities:
+            one = (entity,)
+            if isinstance(entity, Item):
+                item_ids.append(entity.template_id)
+                bonus_order[entity.set_bonus_id] = None
+                batches.add(ITEM_INSERT, item_rows(one))
+                batches.add(ITEM_STAT_INSERT, item_stat_rows(one))
+                batches.add(PET_TALENT_INSERT, pet_talent_rows(one))
+            else:
+                mob_ids.append(entity.template_id)
+                batches.add(MOB_INSERT, mob_rows(one))
+                batches.add(MOB_STAT_INSERT, mob_stat_rows(one))
+
+            if compact_locale:
+                refs.update(entity_locale_refs(entity))
+
+        # Parallel decoding finishes shards out of order.
+        state.bonuses.reorder(bonus_order)
+
+        spells = select_spells(state.spells)
+        batches.add(SPELL_INSERT, spell_rows(spells))
+        batches.add(SPELL_EFFECT_INSERT, spell_effect_rows(spells))
+        if effect_blobs:
+            batches.add(EFFECT_INSERT, effect_rows(spells))
+
+        set_bonuses = select_set_bonuses(state.bonuses)
+        batches.add(SET_BONUS_INSERT, set_bonus_rows(set_bonuses))
+        batches.add(SET_STAT_INSERT, set_stat_rows(set_bonuses))
+
+        if compact_locale:
+            refs.update(cache_locale_refs(spells, set_bonuses))
+            strings, keys = compact_locale_rows(state.cache, refs)
+            batches.add(LOCALE_STRING_INSERT, strings)
+            batches.add(LOCALE_KEY_INSERT, keys)
+        else:
+            batches.add(LOCALE_INSERT, locale_rows(state.cache))
+
+        batches.flush()
+    finally:
+        writer.close()
+
+    if search:
+        cursor.execute(NAME_SEARCH_QUERY)
+        fill_name_search(cursor)
+    create_indexes(cursor, compact_locale)
+
+    return item_ids, mob_ids
+
+
+def initialize(cursor: sqlite3.Cursor, compact_locale: bool = False):
+    cursor.executescript(COMPACT_LOCALE_QUERY if compact_locale else LOCALE_QUERY)
+    cursor.executescript(TABLE_QUERIES)
+
+
+def has_compact_locale(cursor: sqlite3.Cursor) -> bool:
+    row = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'locale_keys'").fetchone()
+    return row is not None
+
+
+def has_name_search(cursor: sqlite3.Cursor) -> bool:
+    row = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'name_search'").fetchone()
+    return row is not None
+
+
+def fill_name_search(cursor: sqlite3.Cursor):
+    cursor.execute("DELETE FROM name_search")
+    cursor.execute(FILL_NAME_SEARCH_QUERY)
+    # Merge the index into one b-tree for faster queries.
+    cursor.execute("INSERT INTO name_search(name_search) VALUES ('optimize')")
+
+
+def create_indexes(cursor: sqlite3.Cursor, compact_locale: bool = False):
+    for query in COMPACT_LOCALE_INDEX_QUERIES if compact_locale else LOCALE_INDEX_QUERIES:
+        cursor.execute(query)
+    for query in INDEX_QUERIES:
+        cursor.execute(query)
+
+    cursor.execute("ANALYZE")
 
-    initialize(cursor)
-    insert_locale_data(cursor, state.cache)
-    insert_spell_data(cursor, state.spells)
-    insert_set_bonuses(cursor, state.bonuses)
-    insert_items(cursor, items)
-    insert_mobs(cursor, mobs)
-    mem.commit()
 
-    with out:
-        mem.backup(out, pages=1)
+def _stat_locale_refs(stats):
+    return (stat.desc_key.id for stat in stats if stat.kind == 4)
 
-    mem.close()
 
+# Locale IDs the rows of one item or mob point at.
+def entity_locale_refs(entity):
+    yield entity.name.id
+    if isinstance(entity, Item) and entity.min_pet_level != 0:
+        yield from (talent.name.id for talent in entity.pet_talents)
+    yield from _stat_locale_refs(entity.stats)
 
-def initialize(cursor: sqlite3.Cursor):
-    cursor.executescript(INIT_QUERIES)
 
+# Locale IDs the spell and set bonus rows point at.
+def cache_locale_refs(spells: list, set_bonuses: list):
+    for _, spell in spells:
+        yield spell.name.id
+        yield spell.description.id
+    for _, set_bonus in set_bonuses:
+        yield set_bonus.name.id
+        for bonus in set_bonus.bonuses:
+            yield from _stat_locale_refs(bonus.stats)
 
-def insert_locale_data(cursor: sqlite3.Cursor, cache: LangCache):
-    cursor.executemany(
-        "INSERT INTO locale_en(id, data) VALUES (?, ?)",
-        cache.lookup.items()
-    )
 
+# Rows for locale_strings and locale_keys, each distinct string stored once.
+def compact_locale_rows(cache: LangCache, refs) -> tuple:
+    strings = {}
+    keys = []
+    for key in sorted(ref for ref in refs if ref is not None):
+        if (data := cache.get(key)) is not None:
+            keys.append((key, strings.setdefault(data, len(strings) + 1)))
 
-def insert_spell_data(cursor: sqlite3.Cursor, cache: SpellCache):
-    spells = []
-    effects = []
-    for template, spell in cache.cache.items():
-        spells.append((
+    return [(string, data) for data, string in strings.items()], keys
+
+
+def select_spells(cache: SpellCache, templates=None) -> list:
+    return [(t, spell) for t, spell in cache.in_manifest_order() if templates is None or t in templates]
+
+
+def select_set_bonuses(cache: SetBonusCache, templates=None) -> list:
+    return [(t, bonus) for t, bonus in cache.cache.items() if templates is None or t in templates]
+
+
+def insert_spell_data(cursor: sqlite3.Cursor, cache: SpellCache, templates=None, blobs: bool = True):
+    spells = select_spells(cache, templates)
+
+    cursor.executemany(SPELL_INSERT, spell_rows(spells))
+    cursor.executemany(SPELL_EFFECT_INSERT, spell_effect_rows(spells))
+    if blobs:
+        cursor.executemany(EFFECT_INSERT, effect_rows(spells))
+
+
+def insert_set_bonuses(cursor: sqlite3.Cursor, cache: SetBonusCache, templates=None):
+    set_bonuses = select_set_bonuses(cache, templates)
+
+    cursor.executemany(SET_BONUS_INSERT, set_bonus_rows(set_bonuses))
+    cursor.executemany(SET_STAT_INSERT, set_stat_rows(set_bonuses))
+
+
+def insert_items(cursor: sqlite3.Cursor, items):
+    cursor.executemany(ITEM_INSERT, item_rows(items))
+    cursor.executemany(ITEM_STAT_INSERT, item_stat_rows(items))
+    cursor.executemany(PET_TALENT_INSERT, pet_talent_rows(items))
+
+def insert_mobs(cursor: sqlite3.Cursor, mobs):
+    cursor.executemany(MOB_INSERT, mob_rows(mobs))
+    cursor.executemany(MOB_STAT_INSERT, mob_stat_rows(mobs))
+
+
+# Row generators shared by the SQLite tables above and the export sinks.
+# Rows are produced while they are consumed, so no second copy of every
+# record is built up front.
+def locale_rows(cache: LangCache):
+    return cache.items()
+
+
+def spell_rows(spells: list):
+    for template, spell in spells:
+        yield (
             template,
             spell.name.id,
             spell.real_name,
@@ -223,50 +595,39 @@ def insert_spell_data(cursor: sqlite3.Cursor, cache: SpellCache):
             spell.life_pips,
             spell.death_pips,
             spell.balance_pips,
-        ))
+        )
 
-        effects.append((template, 1, pack_int_blob(spell.effect_params)))
-        effects.append((template, 2, pack_int_blob(spell.damage_types)))
-        effects.append((template, 3, pack_int_blob(spell.num_rounds)))
 
-    cursor.executemany(
-        "INSERT INTO spells(template_id,name,real_name,image,accuracy,school,description,form,rank,x_pips,shadow_pips,fire_pips,ice_pips,storm_pips,myth_pips,life_pips,death_pips,balance_pips) VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-        spells
-    )
+def spell_effect_rows(spells: list):
+    for template, spell in spells:
+        effects = zip_longest(spell.effect_params, spell.damage_types, spell.num_rounds)
+        for ordinal, (param, damage_type, rounds) in enumerate(effects):
+            yield template, ordinal, param, damage_type, rounds
 
-    cursor.executemany(
-        "INSERT INTO effects(spell,kind,list) VALUES(?,?,?)",
-        effects
-    )
 
+# Longer lists than a blob can hold are only stored in spell_effects.
+def effect_rows(spells: list):
+    for template, spell in spells:
+        for kind, values in ((1, spell.effect_params), (2, spell.damage_types), (3, spell.num_rounds)):
+            if len(values) <= MAX_BLOB_ENTRIES:
+                yield template, kind, pack_int_blob(values)
 
-def insert_set_bonuses(cursor: sqlite3.Cursor, cache: SetBonusCache):
-    set_bonuses = []
-    set_stats = []
 
-    for template, bonus in cache.cache.items():
-        set_bonuses.append((template, bonus.name.id))
-        for bonus in bonus.bonuses:
-            for stat in bonus.stats:
-                set_stats.append((template, bonus.activate_count, *convert_stat(stat)))
+def set_bonus_rows(set_bonuses: list):
+    for template, set_bonus in set_bonuses:
+        yield template, set_bonus.name.id
 
-    cursor.executemany(
-        "INSERT INTO set_bonuses(id,name) VALUES(?,?)",
-        set_bonuses
-    )
-    cursor.executemany(
-        """INSERT INTO set_stats(bonus_set,activate_count,kind,a,b) VALUES(?,?,?,?,?)""",
-        set_stats
-    )
 
+def set_stat_rows(set_bonuses: list):
+    for template, set_bonus in set_bonuses:
+        for bonus in set_bonus.bonuses:
+            for stat in bonus.stats:
+                yield template, bonus.activate_count, *stat.row()
 
-def insert_items(cursor: sqlite3.Cursor, items):
-    values = []
-    talents = []
-    stats = []
 
+def item_rows(items):
     for item in items:
-        values.append((
+        yield (
             item.template_id,
             item.name.id,
             item.set_bonus_id,
@@ -282,31 +643,25 @@ def insert_items(cursor: sqlite3.Cursor, items):
             item.deck_school,
             item.max_tcs,
             item.archmastery_points,
-        ))
+        )
 
-        if item.min_pet_level != 0:
-            for talent in item.pet_talents:
-                talents.append((item.template_id, talent.name.id))
 
+def item_stat_rows(items):
+    for item in items:
         for stat in item.stats:
-            stats.append((item.template_id, *convert_stat(stat)))
-
-    cursor.executemany(
-        "INSERT INTO items(id,name,bonus_set,rarity,jewels,kind,extra_flags,equip_school,equip_level,min_pet_level,max_spells,max_copies,max_school_copies,deck_school,max_tcs,archmastery_points) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-        values
-    )
-    cursor.executemany(
-        """INSERT INTO item_stats(item,kind,a,b) VALUES (?,?,?,?)""",
-        stats
-    )
-    cursor.executemany("INSERT INTO pet_talents (item,name) VALUES (?,?)", talents)
+            yield item.template_id, *stat.row()
 
-def insert_mobs(cursor: sqlite3.Cursor, mobs):
-    values = []
-    stats = []
 
+def pet_talent_rows(items):
+    for item in items:
+        if item.min_pet_level != 0:
+            for talent in item.pet_talents:
+                yield item.template_id, talent.name.id
+
+
+def mob_rows(mobs):
     for mob in mobs:
-        values.append((
+        yield (
             mob.template_id,
             mob.name.id,
             mob.is_boss,
@@ -318,17 +673,10 @@ def insert_mobs(cursor: sqlite3.Cursor, mobs):
             mob.intelligence,
             mob.selfish_factor,
             mob.aggressive_factor,
-        ))
+        )
 
-        for stat in mob.stats:
-            stats.append((mob.template_id, *convert_stat(stat)))
-
-    cursor.executemany(
-        "INSERT INTO mobs(id,name,is_boss,rank,hp,primary_school,secondary_school,is_shadow,intelligence,selfishness,aggressiveness) VALUES (?,?,?,?,?,?,?,?,?,?,?)",
-        values
-    )
-    cursor.executemany(
-        """INSERT INTO mob_stats(mob,kind,a,b) VALUES (?,?,?,?)""",
-        stats
-    )
 
+def mob_stat_rows(mobs):
+    for mob in mobs:
+        for stat in mob.stats:
+            yield mob.template_id, *stat.row()
@@ -0,0 +1,101 @@
+from hashlib import blake2b
+import marshal
+from pathlib import Path
+import sqlite3
+import time
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+# Pending writes are buffered and committed in batches of this size.
+FLUSH_EVERY = 256
+
+INIT_QUERIES = """CREATE TABLE IF NOT EXISTS objects (
+    key  blob    not null primary key,
+    data blob    not null,
+    size integer not null,
+    used real    not null
+);
+
+CREATE INDEX IF NOT EXISTS object_age ON objects(used);
+"""
+
+
+class DecodeCache:
+    def __init__(self, path: Path, types_digest: str):
+        self.path = path
+
+        # Anything that changes how a file decodes or how the result is
+        # stored invalidates every entry.
+        self.salt = f"{types_digest}:{marshal.version}".encode()
+
+        # WAL lets any number of build workers read while one of them
+        # writes; the timeout covers waiting on each other's batches.
+        self.db = sqlite3.connect(str(path), timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(INIT_QUERIES)
+
+        self.pending = []
+        self.used = set()
+
+    def key(self, data) -> bytes:
+        h = blake2b(self.salt, digest_size=20)
+        h.update(data)
+        return h.digest()
+
+    def get(self, key: bytes):
+        row = self.db.execute("SELECT data FROM objects WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+
+        self.used.add(key)
+        return marshal.loads(row[0])
+
+    def put(self, key: bytes, obj):
+        try:
+            data = marshal.dumps(obj)
+        except ValueError:
+            return
+
+        self.pending.append((key, data, len(data), time.time()))
+        if len(self.pending) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if not self.pending and not self.used:
+            return
+
+        now = time.time()
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.executemany(
+                "INSERT OR REPLACE INTO objects(key,data,size,used) VALUES (?,?,?,?)",
+                self.pending
+            )
+            self.db.executemany("UPDATE objects SET used = ? WHERE key = ?", ((now, k) for k in self.used))
+
+        self.pending.clear()
+        self.used.clear()
+
+    def evict(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.flush()
+
+        total = self.db.execute("SELECT coalesce(sum(size), 0) FROM objects").fetchone()[0]
+        if total <= max_bytes:
+            return
+
+        # Drop least recently used entries until we are back under budget.
+        stale = []
+        for key, size in self.db.execute("SELECT key, size FROM objects ORDER BY used"):
+            stale.append((key,))
+            total -= size
+            if total <= max_bytes:
+                break
+
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            self.db.executemany("DELETE FROM objects WHERE key = ?", stale)
+
+    def close(self):
+        self.flush()
+        self.db.close()
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+from .decode_cache import DecodeCache
+from .profile import NULL_PROFILER
+from .prune_types import types_fingerprint
+
+
+# Decoder-independent part of reading serialized game objects: strips
+# the BINd magic and consults the decode cache. Subclasses implement
+# `decode` and name the exception it raises on malformed input.
+class Deserializer:
+    DecodeError = Exception
+
+    cache = None
+    profiler = NULL_PROFILER
+    # Property name sets of the objects seen while collecting, which
+    # `prune_types` matches up with classes.
+    shapes = None
+
+    def attach_cache(self, cache_path: Path, types_path: Path):
+        if cache_path is not None:
+            self.cache = DecodeCache(cache_path, types_fingerprint(types_path))
+
+    def collect_shapes(self):
+        self.shapes = set()
+
+    def observe(self, obj):
+        if self.shapes is None:
+            return
+
+        stack = [obj]
+        while stack:
+            value = stack.pop()
+            if isinstance(value, dict):
+                self.shapes.add(frozenset(value))
+                stack.extend(value.values())
+            elif isinstance(value, list):
+                stack.extend(value)
+
+    def decode(self, data: bytes) -> dict:
+        raise NotImplementedError
+
+    def deserialize(self, data, observe: bool = True):
+        if data[:4] == b"BINd":
+            data = data[4:]
+
+        if self.cache is not None:
+            key = self.cache.key(data)
+            if (obj := self.cache.get(key)) is not None:
+                self.profiler.count_file()
+                if observe:
+                    self.observe(obj)
+                return obj
+
+        # Archive reads may hand out views into the mapped Root.wad;
+        # the decoders only take bytes.
+        if not isinstance(data, bytes):
+            data = bytes(data)
+
+        try:
+            obj = self.decode(data)
+        except self.DecodeError:
+            self.profiler.count_file(failed=True)
+            raise
+
+        self.profiler.count_file()
+
+        if self.cache is not None:
+            self.cache.put(key, obj)
+
+        if observe:
+            self.observe(obj)
+        return obj
+
+    def flush(self):
+        if self.cache is not None:
+            self.cache.flush()
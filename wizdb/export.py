@@ -0,0 +1,274 @@
+from array import array
+import json
+import os
+from pathlib import Path
+import shutil
+import sys
+
+from .db import (
+    item_rows, item_stat_rows, locale_rows, mob_rows, mob_stat_rows, pet_talent_rows,
+    select_set_bonuses, select_spells, set_bonus_rows, set_stat_rows, spell_effect_rows, spell_rows,
+)
+from .utils import np
+
+COLUMNAR_VERSION = 1
+FLUSH_ROWS = 1 << 16
+
+STAT_COLUMNS = (("kind", "int"), ("a", "int"), ("b", "int"), ("value", "real"))
+
+
+# Every table of items.db minus the autoincrement ids, as (name, columns,
+# rows). Column types are one of int, real, text and blob.
+def export_tables(state, items: list, mobs: list):
+    spells = select_spells(state.spells)
+    set_bonuses = select_set_bonuses(state.bonuses)
+
+    yield "locale_en", (("id", "int"), ("data", "text")), locale_rows(state.cache)
+    yield "set_bonuses", (("id", "int"), ("name", "int")), set_bonus_rows(set_bonuses)
+    yield "set_stats", (("bonus_set", "int"), ("activate_count", "int"), *STAT_COLUMNS), set_stat_rows(set_bonuses)
+    yield "items", (
+        ("id", "int"),
+        ("name", "int"),
+        ("bonus_set", "int"),
+        ("rarity", "int"),
+        ("jewels", "int"),
+        ("kind", "int"),
+        ("extra_flags", "int"),
+        ("equip_school", "int"),
+        ("equip_level", "int"),
+        ("min_pet_level", "int"),
+        ("max_spells", "int"),
+        ("max_copies", "int"),
+        ("max_school_copies", "int"),
+        ("deck_school", "int"),
+        ("max_tcs", "int"),
+        ("archmastery_points", "real"),
+    ), item_rows(items)
+    yield "item_stats", (("item", "int"), *STAT_COLUMNS), item_stat_rows(items)
+    yield "pet_talents", (("item", "int"), ("name", "int")), pet_talent_rows(items)
+    yield "spells", (
+        ("template_id", "int"),
+        ("name", "int"),
+        ("real_name", "text"),
+        ("image", "text"),
+        ("accuracy", "int"),
+        ("school", "int"),
+        ("description", "int"),
+        ("form", "int"),
+        ("rank", "int"),
+        ("x_pips", "int"),
+        ("shadow_pips", "int"),
+        ("fire_pips", "int"),
+        ("ice_pips", "int"),
+        ("storm_pips", "int"),
+        ("myth_pips", "int"),
+        ("life_pips", "int"),
+        ("death_pips", "int"),
+        ("balance_pips", "int"),
+    ), spell_rows(spells)
+    yield "spell_effects", (
+        ("spell", "int"),
+        ("ordinal", "int"),
+        ("param", "int"),
+        ("damage_type", "int"),
+        ("rounds", "int"),
+    ), spell_effect_rows(spells)
+    yield "mobs", (
+        ("id", "int"),
+        ("name", "int"),
+        ("is_boss", "int"),
+        ("rank", "int"),
+        ("hp", "int"),
+        ("primary_school", "int"),
+        ("secondary_school", "int"),
+        ("is_shadow", "int"),
+        ("intelligence", "real"),
+        ("selfishness", "real"),
+        ("aggressiveness", "real"),
+    ), mob_rows(mobs)
+    yield "mob_stats", (("mob", "int"), *STAT_COLUMNS), mob_stat_rows(mobs)
+
+
+def export(state, items: list, mobs: list, sink):
+    for name, columns, rows in export_tables(state, items, mobs):
+        sink.write_table(name, columns, rows)
+
+
+def _encode(value) -> bytes:
+    return value.encode() if isinstance(value, str) else bytes(value)
+
+
+class _Column:
+    def __init__(self, directory: Path, table: str, name: str, kind: str):
+        self.kind = kind
+        self.file = f"{table}.{name}.bin"
+        self.out = open(directory / self.file, "wb")
+        self.valid = bytearray()
+
+        if kind in ("text", "blob"):
+            # Value i spans data[offsets[i]:offsets[i + 1]].
+            self.offsets_file = f"{table}.{name}.offsets.bin"
+            self.offsets_out = open(directory / self.offsets_file, "wb")
+            self.offsets = array("q", [0])
+            self.data = bytearray()
+            self.size = 0
+        else:
+            self.values = array("d" if kind == "real" else "q")
+
+    def append(self, value):
+        self.valid.append(value is not None)
+
+        if self.kind in ("text", "blob"):
+            if value is not None:
+                value = _encode(value)
+                self.data += value
+                self.size += len(value)
+            self.offsets.append(self.size)
+        else:
+            self.values.append(0 if value is None else value)
+
+    def flush(self):
+        if self.kind in ("text", "blob"):
+            self.offsets.tofile(self.offsets_out)
+            self.out.write(self.data)
+            del self.offsets[:]
+            self.data.clear()
+        else:
+            self.values.tofile(self.out)
+            del self.values[:]
+
+    def close(self, directory: Path) -> dict:
+        self.flush()
+        self.out.close()
+
+        endian = "<" if sys.byteorder == "little" else ">"
+        if self.kind in ("text", "blob"):
+            self.offsets_out.close()
+            schema = {"type": self.kind, "data": self.file, "offsets": self.offsets_file, "offsets_dtype": f"{endian}i8"}
+        else:
+            schema = {"type": self.kind, "data": self.file, "dtype": f"{endian}{'f8' if self.kind == 'real' else 'i8'}"}
+
+        # Null masks are only written for columns that have nulls.
+        if not all(self.valid):
+            schema["valid"] = self.file.removesuffix(".bin") + ".valid.bin"
+            (directory / schema["valid"]).write_bytes(self.valid)
+
+        return schema
+
+
+# Writes each table column as a flat binary array next to a schema.json
+# describing them, so readers can memory-map columns straight into NumPy.
+class ColumnarSink:
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp = path.with_name(path.name + ".tmp")
+        self.tables = {}
+
+    def __enter__(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        self.tmp.mkdir(parents=True)
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            shutil.rmtree(self.tmp, ignore_errors=True)
+            return
+
+        schema = {"version": COLUMNAR_VERSION, "tables": self.tables}
+        (self.tmp / "schema.json").write_text(json.dumps(schema, indent=2))
+
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp, self.path)
+
+    def write_table(self, name: str, columns: tuple, rows):
+        writers = [_Column(self.tmp, name, column, kind) for column, kind in columns]
+
+        count = 0
+        for row in rows:
+            for writer, value in zip(writers, row):
+                writer.append(value)
+
+            count += 1
+            if count % FLUSH_ROWS == 0:
+                for writer in writers:
+                    writer.flush()
+
+        self.tables[name] = {
+            "rows": count,
+            "columns": {column: writer.close(self.tmp) for (column, _), writer in zip(columns, writers)},
+        }
+
+
+# Streams every row as one JSON object per line, tagged with its table.
+class NdjsonSink:
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp = path.with_name(path.name + ".tmp")
+        self.out = None
+
+    def __enter__(self):
+        self.out = open(self.tmp, "w", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.out.close()
+
+        if exc_type is not None:
+            self.tmp.unlink(missing_ok=True)
+        else:
+            os.replace(self.tmp, self.path)
+
+    def write_table(self, name: str, columns: tuple, rows):
+        names = [column for column, _ in columns]
+        text = [i for i, (_, kind) in enumerate(columns) if kind == "text"]
+        blobs = [i for i, (_, kind) in enumerate(columns) if kind == "blob"]
+
+        for row in rows:
+            if text or blobs:
+                row = list(row)
+                for i in text:
+                    if isinstance(row[i], bytes):
+                        row[i] = row[i].decode("utf-8", "replace")
+                for i in blobs:
+                    if row[i] is not None:
+                        row[i] = bytes(row[i]).hex()
+
+            obj = {"table": name}
+            obj.update(zip(names, row))
+            self.out.write(json.dumps(obj, separators=(",", ":")))
+            self.out.write("\n")
+
+
+SINKS = {
+    "columnar": ColumnarSink,
+    "ndjson": NdjsonSink,
+}
+
+
+# Maps a columnar export back in. Numeric columns are memory-mapped
+# arrays; text and blob columns are (offsets, data) array pairs.
+def open_columnar(path: Path) -> dict:
+    if np is None:
+        raise RuntimeError("reading columnar exports requires NumPy")
+
+    schema = json.loads((path / "schema.json").read_text())
+    if schema["version"] != COLUMNAR_VERSION:
+        raise RuntimeError(f"unsupported columnar export version {schema['version']}")
+
+    def load(file: str, dtype: str):
+        # Zero-length files can't be mapped.
+        if (path / file).stat().st_size == 0:
+            return np.empty(0, dtype)
+        return np.memmap(path / file, dtype=dtype, mode="r")
+
+    tables = {}
+    for name, table in schema["tables"].items():
+        columns = tables[name] = {}
+        for column, info in table["columns"].items():
+            if info["type"] in ("text", "blob"):
+                columns[column] = (load(info["offsets"], info["offsets_dtype"]), load(info["data"], "u1"))
+            else:
+                columns[column] = load(info["data"], info["dtype"])
+
+    return tables
@@ -0,0 +1,47 @@
+# Pulls every value of a few property names out of deeply nested
+# templates, in the order a depth-first walk over the object meets them.
+#
+# Objects of the same class come out of the deserializer with the same
+# keys in the same order, so the walk is planned once per key layout:
+# the plan lists the properties to collect and the ones that can hold
+# nested objects, and every scalar property is skipped outright.
+class FieldExtractor:
+    def __init__(self, *fields: str):
+        self.fields = {field: idx for idx, field in enumerate(fields)}
+        self.plans = {}
+
+    def extract(self, obj: dict) -> tuple:
+        found = tuple([] for _ in self.fields)
+        self._walk(obj, found)
+        return found
+
+    def _compile(self, obj: dict) -> tuple:
+        plan = []
+        for key, value in obj.items():
+            if (idx := self.fields.get(key)) is not None:
+                plan.append((key, idx))
+            elif value is None or isinstance(value, dict):
+                plan.append((key, -1))
+            elif isinstance(value, list):
+                # Lists hold a single property type; one of scalars can
+                # never contain anything to collect.
+                if not value or value[0] is None or isinstance(value[0], (dict, list)):
+                    plan.append((key, -1))
+
+        return tuple(plan)
+
+    def _walk(self, obj: dict, found: tuple):
+        shape = tuple(obj)
+        if (plan := self.plans.get(shape)) is None:
+            plan = self.plans[shape] = self._compile(obj)
+
+        for key, idx in plan:
+            value = obj[key]
+            if idx >= 0:
+                found[idx].append(value)
+            elif isinstance(value, dict):
+                self._walk(value, found)
+            elif isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        self._walk(item, found)
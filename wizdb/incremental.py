@@ -0,0 +1,267 @@
+import json
+import sqlite3
+
+from .db import fill_name_search, has_compact_locale, has_name_search, insert_items, insert_mobs, insert_set_bonuses, insert_spell_data
+from .object_data import find_template_files
+from .prune_types import types_fingerprint
+from .state import State
+from .template_index import ITEM, LOCALE, MOB, OTHER, SET_BONUS, SPELL, TALENT, TemplateIndex
+from .utils import fingerprint
+
+# Bump whenever the schema or the meaning of emitted rows changes, so
+# existing databases are rebuilt from scratch instead of being patched.
+BUILD_VERSION = 5
+
+
+def input_fingerprint(state: State) -> str:
+    # Inputs that affect every emitted row; if any of them change,
+    # nothing short of a full rebuild will do.
+    digests = [types_fingerprint(state.types)]
+    for file in state.stat_rules.sources:
+        digests.append(file.name)
+        digests.append(fingerprint(file.read_bytes()))
+
+    return fingerprint("\n".join(digests).encode())
+
+
+def _file_digest(state: State, file: str) -> str:
+    return fingerprint((state.root_wad / file).read_bytes())
+
+
+def _template_records(state: State, kind: int, templates):
+    for template in templates:
+        if file := state.id_to_file.get(template):
+            yield kind, file, template, _file_digest(state, file)
+
+
+def _locale_records(state: State):
+    for name in sorted(state.cache.files):
+        yield LOCALE, name, 0, fingerprint((state.cache.locale / name).read_bytes())
+
+
+def _write_meta(cursor: sqlite3.Cursor, state: State, missing_spells: set, missing_bonuses: set):
+    cursor.executemany(
+        "INSERT OR REPLACE INTO build_meta(key,value) VALUES (?,?)",
+        (
+            ("version", str(BUILD_VERSION)),
+            ("inputs", input_fingerprint(state)),
+            ("missing_spells", json.dumps(sorted(missing_spells))),
+            ("missing_bonuses", json.dumps(sorted(missing_bonuses))),
+        )
+    )
+
+
+def _write_records(cursor: sqlite3.Cursor, records):
+    cursor.executemany(
+        "INSERT OR REPLACE INTO build_templates(kind,file,id,hash) VALUES (?,?,?,?)",
+        records
+    )
+
+
+def record_build(cursor: sqlite3.Cursor, state: State, item_ids, mob_ids):
+    cursor.execute("DELETE FROM build_templates")
+
+    _write_meta(cursor, state, state.spells.missing, state.bonuses.missing)
+    _write_records(cursor, _template_records(state, ITEM, item_ids))
+    _write_records(cursor, _template_records(state, MOB, mob_ids))
+    _write_records(cursor, _template_records(state, SPELL, state.spells.cache))
+    _write_records(cursor, _template_records(state, SET_BONUS, state.bonuses.cache))
+    _write_records(cursor, _template_records(state, TALENT, state.talents.cache))
+    _write_records(cursor, _locale_records(state))
+
+
+def _in(column: str, values) -> tuple:
+    values = list(values)
+    return f"{column} IN ({','.join('?' * len(values))})", values
+
+
+def _delete_rows(cursor: sqlite3.Cursor, tables, templates):
+    templates = [(t,) for t in templates]
+    for table, column in tables:
+        cursor.executemany(f"DELETE FROM {table} WHERE {column} = ?", templates)
+
+
+def _delete_items(cursor: sqlite3.Cursor, templates):
+    _delete_rows(cursor, (("item_stats", "item"), ("pet_talents", "item"), ("items", "id")), templates)
+
+
+def _delete_mobs(cursor: sqlite3.Cursor, templates):
+    _delete_rows(cursor, (("mob_stats", "mob"), ("mobs", "id")), templates)
+
+
+def _delete_spells(cursor: sqlite3.Cursor, templates):
+    _delete_rows(cursor, (("spell_effects", "spell"), ("effects", "spell"), ("spells", "template_id")), templates)
+
+
+def _delete_set_bonuses(cursor: sqlite3.Cursor, templates):
+    _delete_rows(cursor, (("set_stats", "bonus_set"), ("set_bonuses", "id")), templates)
+
+
+def _select_ids(cursor: sqlite3.Cursor, query: str, values) -> set:
+    values = list(values)
+    if not values:
+        return set()
+
+    clause, params = _in("a", values)
+    return {row[0] for row in cursor.execute(query.format(clause), params)}
+
+
+# Drops strings of lang entries that were removed or renamed.
+def _prune_locale(cursor: sqlite3.Cursor, ids):
+    cursor.execute("CREATE TEMP TABLE live_locale (id integer not null primary key)")
+    cursor.executemany("INSERT INTO live_locale(id) VALUES (?)", ((i,) for i in ids))
+    cursor.execute("DELETE FROM locale_en WHERE id NOT IN (SELECT id FROM live_locale)")
+    cursor.execute("DROP TABLE live_locale")
+
+
+# Patches an existing items.db in place. Returns False without touching
+# it when the database has to be rebuilt from scratch instead.
+def update_db(state: State, db: sqlite3.Connection, deserialize, index: TemplateIndex, search: bool = False) -> bool:
+    # Telling changed spells from unreferenced ones needs all of them.
+    if state.spells.lazy:
+        return False
+
+    if search and not has_name_search(db.cursor()):
+        return False
+
+    # Patching referenced-only locale would mean tracking every reference.
+    if has_compact_locale(db.cursor()):
+        return False
+
+    try:
+        meta = dict(db.execute("SELECT key, value FROM build_meta"))
+    except sqlite3.OperationalError:
+        return False
+
+    if meta.get("version") != str(BUILD_VERSION) or meta.get("inputs") != input_fingerprint(state):
+        return False
+
+    recorded = {kind: {} for kind in (ITEM, MOB, SPELL, SET_BONUS, TALENT, LOCALE)}
+    for kind, file, template, digest in db.execute("SELECT kind, file, id, hash FROM build_templates"):
+        recorded[kind][file] = (template, digest)
+
+    missing_spells = set(json.loads(meta["missing_spells"]))
+    missing_bonuses = set(json.loads(meta["missing_bonuses"]))
+
+    # A template that appears under a name or ID some unchanged template
+    # previously failed to resolve would change that template's rows too.
+    old_spells = {name.decode(): template for template, name in db.execute("SELECT template_id, real_name FROM spells")}
+    if (state.spells.name_to_id.keys() - old_spells.keys()) & missing_spells:
+        return False
+
+    files = find_template_files(state)
+    if any(state.file_to_id[f] in missing_bonuses for f in files):
+        return False
+
+    cursor = db.cursor()
+    # Packed effect blobs are kept up only in databases built with them.
+    effect_blobs = cursor.execute("SELECT 1 FROM effects LIMIT 1").fetchone() is not None
+
+    spell_records = list(_template_records(state, SPELL, state.spells.cache))
+    changed_spells = {
+        template for _, file, template, digest in spell_records
+        if recorded[SPELL].get(file, (None, None))[1] != digest
+    }
+    gone_spells = {t for name, t in old_spells.items() if state.spells.name_to_id.get(name) != t}
+
+    talent_records = list(_template_records(state, TALENT, state.talents.cache))
+    talents_changed = {(f, d) for _, f, _, d in talent_records} != {(f, d) for f, (_, d) in recorded[TALENT].items()}
+
+    # Figure out which ObjectData templates need to be decoded again. The
+    # old rows of every changed template go, even when the index already
+    # knows its new contents won't become rows.
+    emitted = recorded[ITEM] | recorded[MOB]
+    digests = {f: _file_digest(state, f) for f in files}
+    changed = {f for f, digest in digests.items() if emitted.get(f, (None, None))[1] != digest}
+    dirty = {f for f in changed if index.kind(f, digests[f]) != OTHER}
+    removed = {f for f in emitted if f not in digests}
+
+    dirty_ids = set()
+    if talents_changed:
+        dirty_ids |= {row[0] for row in cursor.execute("SELECT DISTINCT item FROM pet_talents")}
+    dirty_ids |= _select_ids(cursor, "SELECT DISTINCT item FROM item_stats WHERE kind IN (3,4) AND {}", gone_spells)
+    dirty_ids |= _select_ids(cursor, "SELECT DISTINCT mob FROM mob_stats WHERE kind IN (3,4) AND {}", gone_spells)
+    dirty |= {state.id_to_file[t] for t in dirty_ids if t in state.id_to_file}
+
+    items, mobs = deserialize(sorted(dirty))
+
+    # Set bonuses whose template changed or which point at removed spells.
+    stale_bonuses = {
+        template for file, (template, digest) in recorded[SET_BONUS].items()
+        if file not in state.file_to_id or _file_digest(state, file) != digest
+    }
+    stale_bonuses |= _select_ids(cursor, "SELECT DISTINCT bonus_set FROM set_stats WHERE kind IN (3,4) AND {}", gone_spells)
+    for template in stale_bonuses:
+        state.bonuses.cache.pop(template, None)
+        state.add_set_bonus(template)
+    state.bonuses.load(state, state.jobs)
+
+    known_bonuses = {template for template, _ in recorded[SET_BONUS].values()}
+    new_bonuses = {t for t in state.bonuses.cache if t in stale_bonuses or t not in known_bonuses}
+
+    # Every lang file of the last build is loaded, so locale_en can be
+    # pruned down to what they still hold. Changed ones are reloaded in full.
+    for name, (_, digest) in recorded[LOCALE].items():
+        path = state.cache.locale / name
+        if not path.exists():
+            continue
+
+        if name not in state.cache.files or fingerprint(path.read_bytes()) != digest:
+            state.cache.add_file(path)
+
+    stale = changed | dirty | removed
+
+    with db:
+        _delete_items(cursor, (emitted[f][0] for f in stale & recorded[ITEM].keys()))
+        _delete_mobs(cursor, (emitted[f][0] for f in stale & recorded[MOB].keys()))
+        insert_items(cursor, items)
+        insert_mobs(cursor, mobs)
+
+        gone_spell_templates = {t for t, _ in recorded[SPELL].values()} - state.spells.cache.keys()
+        _delete_spells(cursor, changed_spells | gone_spell_templates)
+        insert_spell_data(cursor, state.spells, changed_spells, effect_blobs)
+
+        _delete_set_bonuses(cursor, stale_bonuses | new_bonuses)
+        insert_set_bonuses(cursor, state.bonuses, new_bonuses)
+
+        # Drop set bonuses no item refers to anymore, as a full build would.
+        orphans = {row[0] for row in cursor.execute("SELECT id FROM set_bonuses WHERE id NOT IN (SELECT bonus_set FROM items WHERE bonus_set IS NOT NULL)")}
+        _delete_set_bonuses(cursor, orphans)
+
+        cursor.executemany("INSERT OR REPLACE INTO locale_en(id, data) VALUES (?, ?)", state.cache.items())
+        _prune_locale(cursor, (key for key, _ in state.cache.items()))
+
+        # Reloaded lang files may rename untouched records as well, so the
+        # search index is refilled from the tables rather than patched.
+        if has_name_search(cursor):
+            fill_name_search(cursor)
+
+        # Bring the build records in line with what was just written.
+        cursor.executemany(
+            "DELETE FROM build_templates WHERE kind IN (?,?) AND file = ?",
+            ((ITEM, MOB, f) for f in stale)
+        )
+        cursor.executemany(
+            "DELETE FROM build_templates WHERE kind = ? AND id = ?",
+            ((SET_BONUS, t) for t in stale_bonuses | orphans)
+        )
+        cursor.execute("DELETE FROM build_templates WHERE kind IN (?,?)", (SPELL, TALENT))
+
+        _write_records(cursor, _template_records(state, ITEM, (i.template_id for i in items)))
+        _write_records(cursor, _template_records(state, MOB, (m.template_id for m in mobs)))
+        _write_records(cursor, spell_records)
+        _write_records(cursor, _template_records(state, SET_BONUS, new_bonuses - orphans))
+        _write_records(cursor, talent_records)
+        _write_records(cursor, _locale_records(state))
+
+        _write_meta(
+            cursor,
+            state,
+            (missing_spells | state.spells.missing) - state.spells.name_to_id.keys(),
+            missing_bonuses | state.bonuses.missing,
+        )
+
+    # Refresh planner statistics for tables that changed substantially.
+    db.execute("PRAGMA optimize")
+
+    return True
@@ -33,6 +33,12 @@ def is_item_template(obj: dict) -> bool:
 
 
 class Item:
+    __slots__ = (
+        "template_id", "name", "set_bonus_id", "rarity", "equip_reqs", "jewel_sockets", "adjectives",
+        "min_pet_level", "pet_talents", "max_spells", "max_copies", "max_school_copies", "deck_school",
+        "max_tcs", "archmastery_points", "stats",
+    )
+
     def __init__(self, state: State, obj: dict):
         self.template_id = obj["m_templateID"]
         self.name = state.make_lang_key(obj)
@@ -86,7 +92,7 @@ class Item:
                 self.archmastery_points = behavior["m_maxArchmasteryPoints"]
 
             elif name == b"MountItemBehavior":
-                self.stats.append(MultiPassengerStat.extract(behavior))
+                self.stats.append(state.stat_rules.intern(MultiPassengerStat.extract(behavior)))
 
         for effect in obj["m_equipEffects"]:
             if stat := state.translate_stat(effect):
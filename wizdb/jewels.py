@@ -19,6 +19,8 @@
 # 6 - Shield Pin
 # 7 - Sword Pin
 class JewelSockets:
+    __slots__ = ("value",)
+
     def __init__(self):
         self.value = 0
 
@@ -1,12 +1,14 @@
 from pathlib import Path
 
-from .utils import fnv_1a
+from .locale_index import LocaleIndex, source_fingerprint
+from .profile import NULL_PROFILER
+from .utils import fnv_1a, fnv_1a_many
 
 
 # https://github.com/StarrFox/wizwalker/blob/master/wizwalker/file_readers/cache_handler.py#L114
 def _parse_lang_file(file_data: bytes) -> dict:
     try:
-        decoded = file_data.decode("utf-16")
+        decoded = str(file_data, "utf-16")
     except UnicodeDecodeError:
         # empty file
         return {}
@@ -24,36 +26,132 @@ def _parse_lang_file(file_data: bytes) -> dict:
 
 
 class LangCache:
-    def __init__(self, locale_dir: Path):
+    def __init__(self, locale_dir: Path, index_path: Path = None, profiler=NULL_PROFILER):
         self.locale = locale_dir
+        self.profiler = profiler
         self.lookup = {}
+        self.files = set()
+
+        # Keys confirmed absent from their already loaded lang file.
+        self.misses = set()
+
+        self.index = LocaleIndex(index_path) if index_path is not None else None
+        # Loaded lang files whose entries stay in the index. Only the ones
+        # something looked up are copied into `lookup`.
+        self.indexed = set()
+        # Lang files parsed here because the index didn't cover them.
+        self.parsed = {}
 
     def add_entry(self, key: bytes, value: str) -> int:
         key = fnv_1a(key)
         self.lookup[key] = value
+        self.misses.discard(key)
         return key
 
+    def merge(self, entries: dict, files: set):
+        self.lookup.update(entries)
+        for name in files - self.files:
+            if self.index is not None and self.index.covers(self.locale / name):
+                self.indexed.add(name)
+        self.files |= files
+
+    def get(self, key_hash: int) -> str:
+        if (value := self.lookup.get(key_hash)) is not None:
+            return value
+
+        # Only ids that never went through find_entry end up here.
+        for name in self.indexed:
+            if (value := self.index.get(name, key_hash)) is not None:
+                return value
+
+        return None
+
+    # Every loaded (id, string) pair.
+    def items(self):
+        yield from self.lookup.items()
+        for name in sorted(self.indexed):
+            for key, value in self.index.entries(name):
+                if key not in self.lookup:
+                    yield key, value
+
     def find_entry(self, key):
         key_hash = fnv_1a(key)
 
-        if self.lookup.get(key_hash) is None:
-            file, _ = key.decode().split("_", 1)
-            self.add_file((self.locale / file).with_suffix(".lang"))
-
-        if self.lookup.get(key_hash) is not None:
+        if key_hash in self.lookup:
             return key_hash
-        else:
+        if key_hash in self.misses:
             return None
 
+        file, _ = key.decode().split("_", 1)
+        path = (self.locale / file).with_suffix(".lang")
+        if path.name not in self.files:
+            self.add_file(path)
+
+        if key_hash in self.lookup:
+            return key_hash
+        if path.name in self.indexed and (value := self.index.get(path.name, key_hash)) is not None:
+            self.lookup[key_hash] = value
+            return key_hash
+
+        self.misses.add(key_hash)
+        return None
+
     def add_file(self, path: Path):
+        with self.profiler.locale_file():
+            self._add_file(path)
+
+    def _add_file(self, path: Path):
+        self.files.add(path.name)
+        self.misses.clear()
+
+        if self.index is not None and self.index.covers(path):
+            self.indexed.add(path.name)
+            return
+
         data = path.read_bytes()
         mapping = _parse_lang_file(data)
+        entries = list(zip(fnv_1a_many(mapping.keys()), mapping.values()))
+
+        self.lookup.update(entries)
+        self.parsed[path.name] = (source_fingerprint(path), entries)
+
+    def save_index(self, path: Path):
+        # Every loaded file already came out of the index, so it is current.
+        if self.index is not None and self.files <= self.indexed:
+            return
+
+        sources = {}
+        for name in sorted(self.files):
+            lang_file = self.locale / name
+            if name in self.parsed:
+                sources[name] = self.parsed[name]
+            elif name in self.indexed:
+                sources[name] = (self.index.sources[name][0], list(self.index.entries(name)))
+            else:
+                # Loaded by a build worker; parse it once more to index it.
+                mapping = _parse_lang_file(lang_file.read_bytes())
+                entries = list(zip(fnv_1a_many(mapping.keys()), mapping.values()))
+                sources[name] = (source_fingerprint(lang_file), entries)
+
+        # Keep indexed files this build didn't need, they may be next time.
+        if self.index is not None:
+            for name in self.index.sources.keys() - sources.keys():
+                if self.index.covers(self.locale / name):
+                    sources[name] = (self.index.sources[name][0], list(self.index.entries(name)))
 
-        for key, name in mapping.items():
-            self.add_entry(key, name)
+            self.index.close()
+
+        LocaleIndex.write(path, sources)
+
+        # Everything loaded is in the new index now.
+        self.index = LocaleIndex(path)
+        self.indexed = self.files & self.index.sources.keys()
+        self.parsed = {}
 
 
 class LangKey:
+    __slots__ = ("id",)
+
     def __init__(self, cache: LangCache, obj: dict):
         key = obj["m_displayName"]
         if key == b"":
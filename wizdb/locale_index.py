@@ -0,0 +1,176 @@
+from bisect import bisect_left
+import mmap
+import os
+from pathlib import Path
+from struct import error as StructError, Struct
+
+from .wad import WadPath
+
+# Layout, all little-endian:
+#
+# header:  magic "WZLI", u32 version, u32 source count, u32 entry count
+# sources: u32 first entry, u32 entry count, u16 name length, name,
+#          u16 fingerprint length, fingerprint
+# padding: zeros up to the next multiple of 8
+# keys:    u64 key hash per entry, sorted within each source
+# values:  u32 string offset, u32 string length per entry
+# strings: UTF-8 data, offsets relative to the start of this section
+MAGIC = b"WZLI"
+VERSION = 2
+
+_HEADER = Struct("<4sIII")
+_SOURCE = Struct("<II")
+_LEN = Struct("<H")
+_KEY = Struct("<Q")
+_VALUE = Struct("<II")
+
+
+def source_fingerprint(path) -> str:
+    # Cheap change detection that doesn't need to read the file.
+    if isinstance(path, WadPath):
+        entry = path.wad.entries[path.path]
+        return f"wad:{entry.crc:08x}:{entry.size}"
+
+    st = path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+class LocaleIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        # lang file name -> (fingerprint, first entry, entry count)
+        self.sources = {}
+        self._map = None
+        self._view = None
+        self._keys = None
+
+        try:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+
+        self._view = memoryview(self._map)
+
+        # A truncated or otherwise broken index is ignored like a stale one.
+        try:
+            self._read()
+        except (StructError, UnicodeDecodeError, ValueError):
+            self.sources = {}
+
+    def _read(self):
+        magic, version, source_count, entry_count = _HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != VERSION:
+            return
+
+        sources = {}
+        pos = _HEADER.size
+        for _ in range(source_count):
+            first, count = _SOURCE.unpack_from(self._view, pos)
+            pos += _SOURCE.size
+            name, pos = self._read_str(pos)
+            fp, pos = self._read_str(pos)
+
+            if first + count > entry_count:
+                raise ValueError("source entries out of range")
+            sources[name] = (fp, first, count)
+
+        pos = _align(pos)
+        self._values = pos + entry_count * _KEY.size
+        self._strings = self._values + entry_count * _VALUE.size
+        if self._strings > len(self._view):
+            raise ValueError("truncated locale index")
+
+        self._keys = self._view[pos:self._values].cast("Q")
+        self.sources = sources
+
+    def _read_str(self, pos: int):
+        (size,) = _LEN.unpack_from(self._view, pos)
+        pos += _LEN.size
+        return str(self._view[pos:pos + size], "utf-8"), pos + size
+
+    def _string(self, entry: int) -> str:
+        offset, size = _VALUE.unpack_from(self._view, self._values + entry * _VALUE.size)
+        offset += self._strings
+        return str(self._view[offset:offset + size], "utf-8")
+
+    def covers(self, path) -> bool:
+        source = self.sources.get(path.name)
+        if source is None:
+            return False
+
+        try:
+            return source[0] == source_fingerprint(path)
+        except (OSError, KeyError):
+            return False
+
+    def _find(self, name: str, key: int) -> int:
+        _, first, count = self.sources[name]
+        entry = bisect_left(self._keys, key, first, first + count)
+        if entry < first + count and self._keys[entry] == key:
+            return entry
+
+        return None
+
+    def get(self, name: str, key: int) -> str:
+        entry = self._find(name, key)
+        return None if entry is None else self._string(entry)
+
+    def entries(self, name: str):
+        _, first, count = self.sources[name]
+        for entry in range(first, first + count):
+            yield self._keys[entry], self._string(entry)
+
+    def close(self):
+        # Windows can't replace a file that is still mapped.
+        if self._map is None:
+            return
+
+        if self._keys is not None:
+            self._keys.release()
+        self._view.release()
+        self._map.close()
+        self._map = None
+        self.sources = {}
+
+    @staticmethod
+    def write(path: Path, sources: dict):
+        # sources: lang file name -> (fingerprint, [(key hash, string)])
+        header = []
+        keys = []
+        values = []
+        strings = []
+        first = 0
+        offset = 0
+
+        for name, (fp, entries) in sources.items():
+            header.append(_SOURCE.pack(first, len(entries)))
+            for s in (name, fp):
+                s = s.encode()
+                header.append(_LEN.pack(len(s)) + s)
+
+            for key, string in sorted(entries):
+                data = string.encode()
+                keys.append(_KEY.pack(key))
+                values.append(_VALUE.pack(offset, len(data)))
+                strings.append(data)
+                offset += len(data)
+
+            first += len(entries)
+
+        size = _HEADER.size + sum(map(len, header))
+
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(sources), first))
+            f.writelines(header)
+            f.write(bytes(_align(size) - size))
+            f.writelines(keys)
+            f.writelines(values)
+            f.writelines(strings)
+
+        os.replace(tmp, path)
+
+
+def _align(pos: int) -> int:
+    return (pos + 7) & ~7
@@ -15,6 +15,11 @@ def is_mob_template(obj: dict) -> bool:
 
 
 class Mob:
+    __slots__ = (
+        "template_id", "name", "is_boss", "intelligence", "selfish_factor", "aggressive_factor", "rank",
+        "hitpoints", "primary_school", "secondary_school", "is_shadow", "stats",
+    )
+
     def __init__(self, state: State, obj: dict):
         self.template_id = obj["m_templateID"]
         self.name = state.make_lang_key(obj)
@@ -0,0 +1,85 @@
+import time
+
+from .item import Item, is_item_template
+from .mob import Mob, is_mob_template
+from .state import State
+from .template_index import ITEM, MOB, OTHER, TemplateIndex
+from .utils import fingerprint
+
+
+def classify_template(obj: dict) -> int:
+    if obj is None:
+        return OTHER
+    elif is_item_template(obj):
+        return ITEM
+    elif is_mob_template(obj):
+        return MOB
+    else:
+        return OTHER
+
+
+# ObjectData templates in manifest order, the order they are prefetched,
+# decoded and emitted in.
+def find_template_files(state: State) -> list:
+    return [
+        f for f in state.file_to_id
+        if f.startswith("ObjectData/") and f.endswith(".xml")
+    ]
+
+
+def deserialize_template(state: State, file: str, data: bytes, index: TemplateIndex, items: list, mobs: list):
+    digest = fingerprint(data)
+
+    # Templates we already know won't become rows are not worth a decode.
+    if index.kind(file, digest) == OTHER:
+        return
+
+    start = time.perf_counter()
+    failed = False
+    try:
+        obj = state.de.deserialize(data, observe=False)
+    except state.de.DecodeError:
+        obj = None
+        failed = True
+    decoded = time.perf_counter()
+
+    kind = classify_template(obj)
+    # Failures are left unclassified, so they are decoded again next run.
+    if not failed:
+        index.record(file, digest, kind)
+
+    # Templates that don't become rows needn't survive type pruning.
+    if kind != OTHER:
+        state.de.observe(obj)
+
+    if kind == ITEM:
+        items.append(Item(state, obj))
+    elif kind == MOB:
+        mobs.append(Mob(state, obj))
+
+    if state.profiler.enabled:
+        state.profiler.deserialize.add(decoded - start, file)
+        if kind != OTHER:
+            state.profiler.translate.add(time.perf_counter() - decoded, file)
+
+
+# Yields items and mobs in manifest order as their templates are decoded.
+def iter_templates(state: State, files, index: TemplateIndex = None):
+    if index is None:
+        index = TemplateIndex()
+
+    for file, data in state.prefetcher.read(state.root_wad, files):
+        entities = []
+        deserialize_template(state, file, data, index, entities, entities)
+        yield from entities
+
+    state.bonuses.load(state, state.jobs)
+
+
+def deserialize_templates(state: State, files, index: TemplateIndex = None):
+    items = []
+    mobs = []
+    for entity in iter_templates(state, files, index):
+        (items if isinstance(entity, Item) else mobs).append(entity)
+
+    return items, mobs
@@ -0,0 +1,280 @@
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from .item import Item
+from .object_data import deserialize_template
+from .profile import NULL_PROFILER, Profiler
+from .state import State
+from .template_index import OTHER, TemplateIndex
+from .utils import fingerprint, worker_context
+
+# What a worker sends back for one shard: the entities it decoded, and
+# whatever the shard added to the worker's caches since the last one.
+ShardResult = namedtuple(
+    "ShardResult",
+    "decoded profile index locale lang_files bonuses missing_bonuses spells missing_spells shapes",
+)
+
+SHARD_SIZE = 256
+# Shards each worker may run ahead of the oldest unfinished one. Their
+# entities wait in memory until everything before them is done.
+SHARD_WINDOW = 4
+
+# Per-process worker state, set up once by `_init_worker`.
+_state = None
+_slots = None
+_slot = None
+_sent_locale = set()
+_sent_bonuses = set()
+_sent_spells = set()
+_sent_shapes = set()
+
+
+def _init_worker(root_wad: Path, types: Path, decode_cache: Path, locale_index: Path, profile_top: int, make_deserializer, lazy_spells: bool, prefetcher, talents, stat_rules, file_to_id: dict, spells, collect_shapes: bool, slots, counter):
+    global _state, _slots, _slot
+
+    with counter.get_lock():
+        _slot = counter.value
+        counter.value += 1
+    _slots = slots
+
+    profiler = Profiler(profile_top) if profile_top else NULL_PROFILER
+    _state = State(
+        root_wad,
+        types,
+        decode_cache,
+        locale_index,
+        profiler,
+        make_deserializer,
+        lazy_spells,
+        prefetcher,
+        talents=talents,
+        collect_shapes=collect_shapes,
+        stat_rules=stat_rules,
+        file_to_id=file_to_id,
+        spells=spells,
+    )
+
+    # The parent already profiled its own startup.
+    if profiler.enabled:
+        profiler.stages.clear()
+        profiler.take()
+
+    # Everything the worker knows right after startup is known to the
+    # parent as well, so only ship what shards add on top of that.
+    _sent_locale.update(_state.cache.lookup)
+    _sent_bonuses.update(_state.bonuses.pending)
+    _sent_spells.update(_state.spells.cache)
+    _sent_shapes.update(_state.de.shapes or ())
+
+
+def _take_new(cache: dict, sent: set) -> dict:
+    new = {k: v for k, v in cache.items() if k not in sent}
+    sent.update(new)
+    return new
+
+
+def _take_shapes() -> set:
+    if _state.de.shapes is None:
+        return None
+
+    new = _state.de.shapes - _sent_shapes
+    _sent_shapes.update(new)
+    return new
+
+
+def _decode_shard(shard: list, index: TemplateIndex):
+    decoded = []
+    with _state.profiler.stage("shard") as stage:
+        files = _state.prefetcher.read(_state.root_wad, (file for _, file in shard))
+        for (idx, _), (file, data) in zip(shard, files):
+            # Tells the parent which template we were on should we go down.
+            _slots[_slot] = idx
+
+            items = []
+            mobs = []
+            deserialize_template(_state, file, data, index, items, mobs)
+            decoded.extend((idx, item) for item in items)
+            decoded.extend((idx, mob) for mob in mobs)
+
+    _slots[_slot] = -1
+    _state.de.flush()
+
+    if _state.profiler.enabled:
+        _state.profiler.stages.clear()
+        profile = (stage.files, stage.failures, _state.profiler.take())
+    else:
+        profile = None
+
+    return ShardResult(
+        decoded=decoded,
+        profile=profile,
+        index=index,
+        locale=_take_new(_state.cache.lookup, _sent_locale),
+        lang_files=_state.cache.files,
+        bonuses=_take_new(_state.bonuses.pending, _sent_bonuses),
+        missing_bonuses=_state.bonuses.missing,
+        spells=_take_new(_state.spells.cache, _sent_spells),
+        missing_spells=_state.spells.missing,
+        shapes=_take_shapes(),
+    )
+
+
+# Runs `shards` on a fresh pool, yielding from `finish(shard, result)` as
+# each one completes. Returns the shards to reschedule and the templates
+# suspected of killing a worker.
+def _run_pool(state: State, files: list, shards: list, jobs: int, index: TemplateIndex, finish):
+    context = worker_context()
+    slots = context.Array("q", [-1] * jobs, lock=False)
+    counter = context.Value("i", 0)
+    broken = []
+
+    profile_top = state.profiler.deserialize.top if state.profiler.enabled else 0
+    initargs = (
+        state.root_wad,
+        state.types,
+        state.decode_cache,
+        state.locale_index,
+        profile_top,
+        state.make_deserializer,
+        state.lazy_spells,
+        state.prefetcher,
+        state.talents,
+        state.stat_rules,
+        state.file_to_id,
+        state.spells,
+        state.de.shapes is not None,
+        slots,
+        counter,
+    )
+
+    with ProcessPoolExecutor(jobs, mp_context=context, initializer=_init_worker, initargs=initargs) as pool:
+        futures = {}
+        finished = bytearray(len(shards))
+        head = 0
+        submitted = 0
+        while True:
+            while not broken and submitted < min(len(shards), head + jobs * SHARD_WINDOW):
+                work = [(idx, files[idx]) for idx in shards[submitted]]
+                try:
+                    futures[pool.submit(_decode_shard, work, index.subset(f for _, f in work))] = submitted
+                except BrokenProcessPool:
+                    broken.append(shards[submitted])
+                submitted += 1
+
+            if not futures:
+                break
+
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures.pop(future)
+                finished[i] = 1
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken.append(shards[i])
+                    continue
+
+                yield from finish(shards[i], result)
+
+            while head < len(shards) and finished[head]:
+                head += 1
+
+    # Whatever wasn't submitted before the pool broke runs on the next one.
+    broken.extend(shards[submitted:])
+
+    if not broken:
+        return [], []
+
+    # When a worker dies, the executor tears down the whole pool and fails
+    # every outstanding shard. Only the templates that were mid-decode at
+    # that point can be at fault; everything else is simply rescheduled.
+    suspects = sorted(idx for idx in slots if idx >= 0)
+    if not suspects:
+        raise RuntimeError("decoder worker died outside of template decoding")
+
+    retry = [[idx for idx in shard if idx not in suspects] for shard in broken]
+    return [shard for shard in retry if shard], suspects
+
+
+def _merge_result(state: State, index: TemplateIndex, result: ShardResult) -> list:
+    if result.profile is not None:
+        state.profiler.merge(*result.profile)
+    index.merge(result.index)
+    state.cache.merge(result.locale, result.lang_files)
+    state.bonuses.merge(result.bonuses, result.missing_bonuses)
+    state.spells.merge(result.spells, result.missing_spells)
+    if result.shapes:
+        state.de.shapes |= result.shapes
+
+    return result.decoded
+
+
+# Yields items and mobs in manifest order while shards are still being
+# decoded. Shards finish in any order, so entities are only held back
+# until every template before them is done.
+def iter_parallel(state: State, files: list, jobs: int, index: TemplateIndex = None):
+    if index is None:
+        index = TemplateIndex()
+
+    # Workers start out with the parent's spells, so they share one map of
+    # spell names instead of each decoding every spell to build its own.
+    if state.spells.lazy:
+        state.spells.locate(state)
+
+    files = list(files)
+    pending = [list(range(i, min(i + SHARD_SIZE, len(files)))) for i in range(0, len(files), SHARD_SIZE)]
+    done = bytearray(len(files))
+    ready = {}
+    emitted = 0
+    crashed = []
+
+    def drain():
+        nonlocal emitted
+        while emitted < len(files) and done[emitted]:
+            yield from ready.pop(emitted, ())
+            emitted += 1
+
+    def finish(shard: list, result: ShardResult):
+        for idx, entity in _merge_result(state, index, result):
+            ready.setdefault(idx, []).append(entity)
+        for idx in shard:
+            done[idx] = 1
+
+        yield from drain()
+
+    while pending:
+        pending, suspects = yield from _run_pool(state, files, pending, jobs, index, finish)
+
+        # Retry every suspect alone, so a crash can only be its own fault.
+        for idx in suspects:
+            _, culprit = yield from _run_pool(state, files, [[idx]], 1, index, finish)
+            crashed.extend(culprit)
+            for crash in culprit:
+                done[crash] = 1
+            yield from drain()
+
+    for idx in sorted(crashed):
+        file = files[idx]
+        print(f"Skipping {file}: template crashed the decoder")
+
+        # Don't feed it to the decoder again until its contents change.
+        data = (state.root_wad / file).read_bytes()
+        index.record(file, fingerprint(data), OTHER)
+
+    # Workers only pass on which set bonuses their items refer to.
+    state.bonuses.load(state, jobs)
+
+
+def deserialize_parallel(state: State, files: list, jobs: int, index: TemplateIndex = None):
+    items = []
+    mobs = []
+    for entity in iter_parallel(state, files, jobs, index):
+        (items if isinstance(entity, Item) else mobs).append(entity)
+
+    # Same for the set bonuses, which a serial build adds as items reference them.
+    state.bonuses.reorder(item.set_bonus_id for item in items)
+
+    return items, mobs
@@ -0,0 +1,75 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
+from threading import Lock
+
+DEFAULT_THREADS = 4
+DEFAULT_DEPTH = 64
+DEFAULT_READ_AHEAD = 64 << 20
+
+
+# Reads files ahead of the decoder on a few background threads, so disk
+# latency overlaps with deserialization. Files come back in the order
+# they were asked for; at most `depth` files and roughly `max_bytes` of
+# unconsumed data are read ahead at any time.
+class Prefetcher:
+    def __init__(self, threads: int = DEFAULT_THREADS, depth: int = DEFAULT_DEPTH, max_bytes: int = DEFAULT_READ_AHEAD):
+        self.threads = threads
+        self.depth = max(depth, 1)
+        self.max_bytes = max_bytes
+        self.pool = None
+        self.pid = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["pool"] = None
+        return state
+
+    def read(self, root, files):
+        if self.threads <= 0:
+            for file in files:
+                yield file, (root / file).read_bytes()
+            return
+
+        # Forked build workers inherit the pool but none of its threads.
+        if self.pool is None or self.pid != os.getpid():
+            self.pool = ThreadPoolExecutor(self.threads, thread_name_prefix="wizdb-prefetch")
+            self.pid = os.getpid()
+
+        files = iter(files)
+        pending = deque()
+        buffered = [0]
+        lock = Lock()
+
+        def read(file):
+            data = (root / file).read_bytes()
+            with lock:
+                buffered[0] += len(data)
+            return data
+
+        def fill():
+            while len(pending) < self.depth and buffered[0] < self.max_bytes:
+                file = next(files, None)
+                if file is None:
+                    return
+                pending.append((file, self.pool.submit(read, file)))
+
+        try:
+            fill()
+            while pending:
+                file, future = pending.popleft()
+                data = future.result()
+                with lock:
+                    buffered[0] -= len(data)
+
+                fill()
+                yield file, data
+        finally:
+            # Don't leave reads running for a consumer that stopped early.
+            for _, future in pending:
+                future.cancel()
+
+    def close(self):
+        if self.pool is not None and self.pid == os.getpid():
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
@@ -0,0 +1,38 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from .utils import worker_context
+
+BATCH_SIZE = 64
+PARALLEL_MIN = 256
+
+# Per-process deserializer, set up once by `_init_decoder`.
+_de = None
+
+
+def _init_decoder(make_deserializer, types, decode_cache):
+    global _de
+    _de = make_deserializer(types, decode_cache)
+
+
+def _decode_batch(root, files: list) -> list:
+    objs = [_de.deserialize((root / file).read_bytes()) for file in files]
+    _de.flush()
+    return objs
+
+
+# Decodes a known list of dependency templates in one go and returns the
+# objects in `files` order. With more than one job, a short-lived pool of
+# workers that only hold a deserializer does the decoding; lists too short
+# to pay for starting it are decoded right here.
+def decode_templates(state, files: list, jobs: int = 1) -> list:
+    if jobs <= 1 or len(files) < PARALLEL_MIN:
+        return [state.de.deserialize(data) for _, data in state.prefetcher.read(state.root_wad, files)]
+
+    batches = [files[i:i + BATCH_SIZE] for i in range(0, len(files), BATCH_SIZE)]
+    initargs = (state.make_deserializer, state.types, state.decode_cache)
+    with ProcessPoolExecutor(min(jobs, len(batches)), mp_context=worker_context(), initializer=_init_decoder, initargs=initargs) as pool:
+        objs = [obj for objs in pool.map(_decode_batch, [state.root_wad] * len(batches), batches) for obj in objs]
+
+    for obj in objs:
+        state.de.observe(obj)
+    return objs
@@ -0,0 +1,182 @@
+from contextlib import contextmanager, nullcontext
+import heapq
+import json
+from pathlib import Path
+import sys
+import time
+
+
+# Largest resident set size the process (or its finished children) had so
+# far, None where getrusage isn't available (Windows). This is a lifetime
+# maximum, not the peak within whatever stage asks for it.
+def _max_rss(children: bool = False) -> int:
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and KiB elsewhere.
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def _mib(size: int) -> str:
+    return "-" if size is None else f"{size / 2**20:.1f} MiB"
+
+
+class Stage:
+    def __init__(self, name: str, depth: int):
+        self.name = name
+        self.depth = depth
+        self.wall = 0.
+        self.files = 0
+        self.failures = 0
+        self.max_rss = None
+        self.max_worker_rss = None
+
+    def to_json(self) -> dict:
+        return {
+            "name": self.name,
+            "depth": self.depth,
+            "wall": self.wall,
+            "files": self.files,
+            "files_per_second": self.files / self.wall if self.wall else 0.,
+            "failures": self.failures,
+            "max_rss": self.max_rss,
+            "max_worker_rss": self.max_worker_rss,
+        }
+
+
+class TemplateTimes:
+    # Keeps the `top` slowest (seconds, template) samples.
+    def __init__(self, top: int):
+        self.top = top
+        self.heap = []
+
+    def add(self, seconds: float, template: str):
+        if len(self.heap) < self.top:
+            heapq.heappush(self.heap, (seconds, template))
+        elif seconds > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (seconds, template))
+
+    def merge(self, samples):
+        for seconds, template in samples:
+            self.add(seconds, template)
+
+    def slowest(self) -> list:
+        return sorted(self.heap, reverse=True)
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self, top: int = 10):
+        self.stages = []
+        self.active = []
+        self.deserialize = TemplateTimes(top)
+        self.translate = TemplateTimes(top)
+
+        # Lang files get loaded lazily from within other stages, so their
+        # cost is accumulated separately.
+        self.locale = Stage("locale loading (cumulative)", 0)
+
+    @contextmanager
+    def stage(self, name: str):
+        stage = Stage(name, len(self.active))
+        self.stages.append(stage)
+        self.active.append(stage)
+
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.wall = time.perf_counter() - start
+            stage.max_rss = _max_rss()
+            stage.max_worker_rss = _max_rss(children=True)
+            self.active.pop()
+
+    def count_file(self, failed: bool = False):
+        for stage in self.active:
+            stage.files += 1
+            stage.failures += failed
+
+    @contextmanager
+    def locale_file(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.locale.wall += time.perf_counter() - start
+            self.locale.files += 1
+
+    def take(self) -> tuple:
+        # Hands the samples collected so far over to a parent process.
+        samples = (
+            self.deserialize.slowest(),
+            self.translate.slowest(),
+            self.locale.wall,
+            self.locale.files,
+        )
+
+        self.deserialize.heap.clear()
+        self.translate.heap.clear()
+        self.locale.wall = 0.
+        self.locale.files = 0
+
+        return samples
+
+    def merge(self, files: int, failures: int, samples: tuple):
+        deserialize, translate, locale_wall, locale_files = samples
+
+        for stage in self.active:
+            stage.files += files
+            stage.failures += failures
+
+        self.deserialize.merge(deserialize)
+        self.translate.merge(translate)
+        self.locale.wall += locale_wall
+        self.locale.files += locale_files
+
+    def to_json(self) -> dict:
+        return {
+            "stages": [s.to_json() for s in self.stages + [self.locale]],
+            "slowest_deserialize": [{"template": t, "seconds": s} for s, t in self.deserialize.slowest()],
+            "slowest_translate": [{"template": t, "seconds": s} for s, t in self.translate.slowest()],
+        }
+
+    def dump(self, path: Path):
+        path.write_text(json.dumps(self.to_json(), indent=2))
+
+    def report(self) -> str:
+        lines = [f"{'stage':<32} {'wall':>9} {'files':>8} {'files/s':>9} {'failed':>7} {'max RSS':>10} {'workers':>10}"]
+        for stage in self.stages + [self.locale]:
+            rate = stage.files / stage.wall if stage.wall else 0.
+            lines.append(
+                f"{'  ' * stage.depth + stage.name:<32} {stage.wall:>8.2f}s {stage.files:>8} {rate:>9.1f}"
+                f" {stage.failures:>7} {_mib(stage.max_rss):>10} {_mib(stage.max_worker_rss):>10}"
+            )
+        lines.append("(RSS is the largest the process had by the end of each stage, not a per-stage peak)")
+
+        for title, times in (("deserialize", self.deserialize), ("translate", self.translate)):
+            lines.append("")
+            lines.append(f"Slowest templates to {title}:")
+            for seconds, template in times.slowest():
+                lines.append(f"  {seconds * 1000:>9.2f} ms  {template}")
+
+        return "\n".join(lines)
+
+
+class NullProfiler:
+    enabled = False
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def count_file(self, failed: bool = False):
+        pass
+
+    def locale_file(self):
+        return nullcontext()
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,122 @@
+import json
+import os
+from pathlib import Path
+import re
+
+from .utils import fingerprint
+
+PRUNE_VERSION = 3
+SNAPSHOT_SUFFIX = ".pruned.json"
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][\w:]*")
+
+
+def _bare(name: str) -> str:
+    # "class ItemTemplate" and "ItemTemplate" name the same class.
+    return name.rsplit(" ", 1)[-1]
+
+
+# Where the pruned copy of a types dump lives. It is keyed by the dump's
+# contents and the template manifest, so neither a new dump nor a game
+# patch adding templates picks up a snapshot made from the old ones.
+def snapshot_path(types_path: Path, manifest: bytes) -> Path:
+    source = fingerprint(types_path.read_bytes())
+    key = fingerprint(f"{PRUNE_VERSION}:{fingerprint(manifest)}".encode())
+    return types_path.with_name(f"{types_path.stem}.{source}.{key}{SNAPSHOT_SUFFIX}")
+
+
+# Fingerprint of the types dump that decodes like `path`. A snapshot
+# decodes exactly like the types.json it was cut from, so it goes by that
+# one's fingerprint, which its name carries. Whatever is keyed by this
+# survives switching between the two.
+def types_fingerprint(path: Path) -> str:
+    if path.name.endswith(SNAPSHOT_SUFFIX):
+        return path.name.removesuffix(SNAPSHOT_SUFFIX).rsplit(".", 2)[1]
+
+    return fingerprint(path.read_bytes())
+
+
+# Keys of every class a decoder needs for objects of the given shapes:
+# the classes whose property names match a shape, their bases and the
+# classes their properties hold. Objects are serialized with their
+# dynamic type, so anything derived from a matched or held class is kept
+# as well; bases only kept as such don't bring in their other subclasses.
+# Also returns how many shapes matched no class at all.
+def type_closure(classes: dict, shapes) -> tuple:
+    by_name = {}
+    by_properties = {}
+    derived = {}
+    for key, entry in classes.items():
+        by_name[_bare(entry.get("name", key))] = key
+        by_properties.setdefault(frozenset(entry["properties"]), []).append(key)
+    for key, entry in classes.items():
+        for base in entry.get("bases", ()):
+            if (base_key := by_name.get(_bare(base))) is not None:
+                derived.setdefault(base_key, []).append(key)
+
+    stack = []
+    unmatched = 0
+    for shape in shapes:
+        if (keys := by_properties.get(shape)) is None:
+            unmatched += 1
+        else:
+            stack.extend((key, _expands(classes[key])) for key in keys)
+
+    # Maps each kept class to whether its subclasses are kept too.
+    kept = {}
+    while stack:
+        key, expand = stack.pop()
+        if key in kept and (kept[key] or not expand):
+            continue
+
+        if key not in kept:
+            entry = classes[key]
+            for base in entry.get("bases", ()):
+                if (base_key := by_name.get(_bare(base))) is not None:
+                    stack.append((base_key, False))
+            for prop in entry["properties"].values():
+                for name in _IDENTIFIER.findall(prop["type"]):
+                    if (prop_key := by_name.get(name)) is not None:
+                        stack.append((prop_key, _expands(classes[prop_key])))
+
+        kept[key] = expand
+        if expand:
+            stack.extend((child, True) for child in derived.get(key, ()))
+
+    return kept.keys(), unmatched
+
+
+def _expands(entry: dict) -> bool:
+    # Root classes like PropertyClass would drag in everything.
+    return bool(entry.get("bases"))
+
+
+def prune_types(types: dict, shapes) -> tuple:
+    classes = types.get("classes", {})
+    kept, unmatched = type_closure(classes, shapes)
+
+    pruned = dict(types)
+    pruned["classes"] = {key: entry for key, entry in classes.items() if key in kept}
+    return pruned, unmatched
+
+
+# Writes the pruned snapshot for `types_path`, drops snapshots of older
+# dumps and returns its path along with the number of unmatched shapes.
+# Nothing is written when some decoded object matched no class, since
+# pruning could then throw away types that are in use.
+def write_snapshot(types_path: Path, manifest: bytes, shapes) -> tuple:
+    types = json.loads(types_path.read_bytes())
+    pruned, unmatched = prune_types(types, shapes)
+    if unmatched:
+        return None, unmatched
+
+    path = snapshot_path(types_path, manifest)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(pruned, separators=(",", ":")))
+    os.replace(tmp, path)
+
+    for old in types_path.parent.glob(f"{types_path.stem}.*{SNAPSHOT_SUFFIX}"):
+        if old != path:
+            old.unlink(missing_ok=True)
+
+    return path, 0
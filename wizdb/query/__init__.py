@@ -0,0 +1,10 @@
+# Read-only access to a built items.db. Only depends on the standard
+# library, so it can be used without kobold or the game files.
+from .blobs import unpack_int_blob, unpack_stat_value
+from .database import ItemDB
+from .loaders import (
+    SetStat, Stat, load_item_stats, load_items, load_mob_stats, load_mobs, load_pet_talents,
+    load_set_bonuses, load_set_stats, load_spell_effect_blobs, load_spell_effects, load_spells,
+)
+from .locale import LocaleCache
+from .pool import ConnectionPool, connect
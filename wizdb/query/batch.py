@@ -0,0 +1,15 @@
+# IN (...) lists are padded up to one of a few fixed lengths, so each
+# query only ever has a handful of distinct SQL texts and keeps hitting
+# the connection's prepared statement cache.
+BUCKETS = (1, 8, 64, 512)
+PLACEHOLDERS = {size: ",".join("?" * size) for size in BUCKETS}
+
+
+def in_batches(values) -> tuple:
+    values = list(dict.fromkeys(values))
+
+    step = BUCKETS[-1]
+    for start in range(0, len(values), step):
+        chunk = values[start:start + step]
+        size = next(b for b in BUCKETS if b >= len(chunk))
+        yield PLACEHOLDERS[size], chunk + chunk[-1:] * (size - len(chunk))
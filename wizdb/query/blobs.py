@@ -0,0 +1,20 @@
+from struct import unpack_from
+import sys
+
+
+# effects.list blobs are a count byte followed by little-endian int32s.
+# On little-endian hosts the ints are handed out as a view into the blob
+# itself instead of being copied out.
+def unpack_int_blob(blob: bytes):
+    view = memoryview(blob)
+    count = (len(view) - 1) // 4
+
+    if sys.byteorder == "little":
+        return view[1:1 + count * 4].cast("i")
+    else:
+        return unpack_from(f"<{count}i", view, 1)
+
+
+# Stat rows of kind 1 store their value as the bits of a float32.
+def unpack_stat_value(b: int) -> float:
+    return unpack_from("<f", b.to_bytes(4, "little"))[0]
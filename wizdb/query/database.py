@@ -0,0 +1,215 @@
+from pathlib import Path
+import sqlite3
+
+from .loaders import (
+    load_item_stats, load_items, load_mob_stats, load_mobs, load_pet_talents, load_set_bonuses,
+    load_set_stats, load_spell_effects, load_spells,
+)
+from .locale import DEFAULT_LOCALE_CACHE, LocaleCache
+from .pool import ConnectionPool
+
+SEARCH_KINDS = ("item", "mob", "spell", "set_bonus")
+
+STAT_OWNERS = {"items": ("item_stats", "item"), "mobs": ("mob_stats", "mob"), "set_bonuses": ("set_stats", "bonus_set")}
+
+
+def stat_category(name: str) -> int:
+    # Only needed when looking stats up by name; keeps NumPy out of the
+    # import path otherwise.
+    from ..utils import fnv_1a
+    return fnv_1a(name)
+
+
+# Read side of items.db: resolves records together with their stats,
+# talents, set bonuses and display names in a fixed number of queries.
+class ItemDB:
+    def __init__(self, path: Path, pool_size: int = 4, locale_cache: int = DEFAULT_LOCALE_CACHE):
+        self.pool = ConnectionPool(path, pool_size)
+        self.locale = LocaleCache(self.pool, locale_cache)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.pool.close()
+
+    def find_ids(self, table: str, name: str) -> list:
+        if table not in ("items", "mobs"):
+            raise ValueError(f"can't look up {table} by name")
+
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {table}.id FROM locale_en JOIN {table} ON {table}.name = locale_en.id WHERE locale_en.data = ?",
+                (name,)
+            )
+            return [row[0] for row in rows]
+
+    # (id, value) of everything granting a stat within [minimum, maximum],
+    # highest first. `stat` is a canonical effect name or its hash.
+    def find_by_stat(self, table: str, stat, minimum: float = None, maximum: float = None, limit: int = None) -> list:
+        if table not in STAT_OWNERS:
+            raise ValueError(f"{table} has no stats")
+        stats, owner = STAT_OWNERS[table]
+
+        category = stat_category(stat) if isinstance(stat, str) else stat
+
+        query = f"SELECT {owner}, value FROM {stats} WHERE kind = 1 AND a = ?"
+        params = [category]
+        if minimum is not None:
+            query += " AND value >= ?"
+            params.append(minimum)
+        if maximum is not None:
+            query += " AND value <= ?"
+            params.append(maximum)
+        query += " ORDER BY value DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        with self.pool.connection() as conn:
+            return conn.execute(query, params).fetchall()
+
+    # Ranked (kind, id) matches for a search box query, best first. Exact
+    # substring matches come before ones that only share some trigrams
+    # with the query, which is what makes typos still find something.
+    def search(self, text: str, kinds=SEARCH_KINDS, limit: int = 20) -> list:
+        text = text.strip()
+        kinds = [kind for kind in kinds if kind in SEARCH_KINDS]
+        if not text or not kinds:
+            return []
+
+        where = f"kind IN ({','.join('?' * len(kinds))})"
+        found = {}
+
+        with self.pool.connection() as conn:
+            try:
+                if len(text) < 3:
+                    # Too short for trigrams; fall back to a scan.
+                    rows = conn.execute(
+                        f"SELECT rowid, kind FROM name_search WHERE name LIKE ? AND {where} ORDER BY length(name) LIMIT ?",
+                        (f"%{text}%", *kinds, limit)
+                    )
+                    return [(kind, entity) for entity, kind in rows]
+
+                phrase = '"' + text.replace('"', '""') + '"'
+                trigrams = dict.fromkeys(text[i:i + 3].replace('"', '""') for i in range(len(text) - 2))
+                fuzzy = " OR ".join(f'"{trigram}"' for trigram in trigrams)
+
+                for match in (phrase, fuzzy):
+                    rows = conn.execute(
+                        f"SELECT rowid, kind FROM name_search WHERE name_search MATCH ? AND {where} "
+                        "ORDER BY bm25(name_search, 10.0, 1.0) LIMIT ?",
+                        (match, *kinds, limit)
+                    )
+                    for entity, kind in rows:
+                        found.setdefault(entity, kind)
+
+                    if len(found) >= limit:
+                        break
+            except sqlite3.OperationalError as err:
+                if "no such table" in str(err):
+                    raise RuntimeError("database was built without --fts") from err
+                raise
+
+        return [(kind, entity) for entity, kind in list(found.items())[:limit]]
+
+    # Templates of spells with an effect of the given damage school whose
+    # param falls within [minimum, maximum].
+    def find_spells_by_effect(self, damage_type: int = None, minimum: int = None, maximum: int = None) -> list:
+        query = "SELECT DISTINCT spell FROM spell_effects WHERE 1"
+        params = []
+        if damage_type is not None:
+            query += " AND damage_type = ?"
+            params.append(damage_type)
+        if minimum is not None:
+            query += " AND param >= ?"
+            params.append(minimum)
+        if maximum is not None:
+            query += " AND param <= ?"
+            params.append(maximum)
+
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute(query, params)]
+
+    def items(self, ids) -> list:
+        ids = list(ids)
+        with self.pool.connection() as conn:
+            rows = load_items(conn, ids)
+            stats = load_item_stats(conn, rows)
+            talents = load_pet_talents(conn, rows)
+
+            set_ids = {row["bonus_set"] for row in rows.values() if row["bonus_set"]}
+            set_names = load_set_bonuses(conn, set_ids)
+            set_stats = load_set_stats(conn, set_ids)
+
+        names = self.locale.get_many([
+            *(row["name"] for row in rows.values()),
+            *(name for names in talents.values() for name in names),
+            *set_names.values(),
+        ])
+
+        items = []
+        for item_id in ids:
+            if (row := rows.get(item_id)) is None:
+                continue
+
+            item = dict(row)
+            item["name"] = names.get(row["name"])
+            item["stats"] = stats[item_id]
+            item["pet_talents"] = [names.get(name) for name in talents[item_id]]
+
+            if bonus_set := row["bonus_set"]:
+                item["set_bonus"] = {"name": names.get(set_names.get(bonus_set)), "stats": set_stats.get(bonus_set, [])}
+            else:
+                item["set_bonus"] = None
+
+            items.append(item)
+
+        return items
+
+    def mobs(self, ids) -> list:
+        ids = list(ids)
+        with self.pool.connection() as conn:
+            rows = load_mobs(conn, ids)
+            stats = load_mob_stats(conn, rows)
+
+        names = self.locale.get_many(row["name"] for row in rows.values())
+
+        mobs = []
+        for mob_id in ids:
+            if (row := rows.get(mob_id)) is None:
+                continue
+
+            mob = dict(row)
+            mob["name"] = names.get(row["name"])
+            mob["stats"] = stats[mob_id]
+            mobs.append(mob)
+
+        return mobs
+
+    def spells(self, templates) -> list:
+        templates = list(templates)
+        with self.pool.connection() as conn:
+            rows = load_spells(conn, templates)
+            effects = load_spell_effects(conn, rows)
+
+        names = self.locale.get_many([
+            *(row["name"] for row in rows.values()),
+            *(row["description"] for row in rows.values()),
+        ])
+
+        spells = []
+        for template in templates:
+            if (row := rows.get(template)) is None:
+                continue
+
+            spell = dict(row)
+            spell["name"] = names.get(row["name"])
+            spell["description"] = names.get(row["description"])
+            spell.update(effects[template])
+            spells.append(spell)
+
+        return spells
@@ -0,0 +1,97 @@
+from collections import namedtuple
+import sqlite3
+
+from .batch import in_batches
+from .blobs import unpack_int_blob
+
+Stat = namedtuple("Stat", "kind a b value")
+SetStat = namedtuple("SetStat", "activate_count kind a b value")
+
+EFFECT_KINDS = {1: "effect_params", 2: "damage_types", 3: "num_rounds"}
+
+
+# Each loader takes many keys and answers with one dict keyed by them,
+# running one query per batch of keys instead of one per key.
+def _rows(conn: sqlite3.Connection, query: str, keys):
+    for placeholders, chunk in in_batches(keys):
+        yield from conn.execute(query.format(placeholders), chunk)
+
+
+def _grouped(conn: sqlite3.Connection, query: str, keys, make) -> dict:
+    # Iterated twice below, and callers may hand in a generator.
+    keys = list(keys)
+    found = {key: [] for key in keys}
+    for key, *values in _rows(conn, query, keys):
+        found[key].append(make(*values))
+
+    return found
+
+
+def _by_id(conn: sqlite3.Connection, query: str, keys) -> dict:
+    conn.row_factory = sqlite3.Row
+    try:
+        return {row[0]: row for row in _rows(conn, query, keys)}
+    finally:
+        conn.row_factory = None
+
+
+def load_items(conn: sqlite3.Connection, ids) -> dict:
+    return _by_id(conn, "SELECT * FROM items WHERE id IN ({})", ids)
+
+
+def load_mobs(conn: sqlite3.Connection, ids) -> dict:
+    return _by_id(conn, "SELECT * FROM mobs WHERE id IN ({})", ids)
+
+
+def load_spells(conn: sqlite3.Connection, templates) -> dict:
+    return _by_id(conn, "SELECT template_id, * FROM spells WHERE template_id IN ({})", templates)
+
+
+def load_item_stats(conn: sqlite3.Connection, ids) -> dict:
+    return _grouped(conn, "SELECT item, kind, a, b, value FROM item_stats WHERE item IN ({}) ORDER BY id", ids, Stat)
+
+
+def load_mob_stats(conn: sqlite3.Connection, ids) -> dict:
+    return _grouped(conn, "SELECT mob, kind, a, b, value FROM mob_stats WHERE mob IN ({}) ORDER BY id", ids, Stat)
+
+
+def load_pet_talents(conn: sqlite3.Connection, ids) -> dict:
+    return _grouped(conn, "SELECT item, name FROM pet_talents WHERE item IN ({}) ORDER BY id", ids, lambda name: name)
+
+
+def load_set_bonuses(conn: sqlite3.Connection, ids) -> dict:
+    return dict(_rows(conn, "SELECT id, name FROM set_bonuses WHERE id IN ({})", ids))
+
+
+def load_set_stats(conn: sqlite3.Connection, ids) -> dict:
+    return _grouped(
+        conn,
+        "SELECT bonus_set, activate_count, kind, a, b, value FROM set_stats WHERE bonus_set IN ({}) ORDER BY id",
+        ids,
+        SetStat,
+    )
+
+
+# Spell template -> {"effect_params": [...], "damage_types": [...], ...}.
+def load_spell_effects(conn: sqlite3.Connection, templates) -> dict:
+    templates = list(templates)
+    found = {template: {name: [] for name in EFFECT_KINDS.values()} for template in templates}
+    query = "SELECT spell, param, damage_type, rounds FROM spell_effects WHERE spell IN ({}) ORDER BY spell, ordinal"
+    for template, *values in _rows(conn, query, templates):
+        for name, value in zip(EFFECT_KINDS.values(), values):
+            if value is not None:
+                found[template][name].append(value)
+
+    return found
+
+
+# Same as load_spell_effects, from the packed effects table. Lists too long
+# for a blob are missing from it and only found in spell_effects.
+def load_spell_effect_blobs(conn: sqlite3.Connection, templates) -> dict:
+    templates = list(templates)
+    found = {template: {} for template in templates}
+    for template, kind, blob in _rows(conn, "SELECT spell, kind, list FROM effects WHERE spell IN ({})", templates):
+        if name := EFFECT_KINDS.get(kind):
+            found[template][name] = unpack_int_blob(blob)
+
+    return found
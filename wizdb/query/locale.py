@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+from .batch import in_batches
+from .pool import ConnectionPool
+
+DEFAULT_LOCALE_CACHE = 4096
+
+
+# Least-recently-used cache of locale_en strings by id.
+class LocaleCache:
+    def __init__(self, pool: ConnectionPool, size: int = DEFAULT_LOCALE_CACHE):
+        self.pool = pool
+        self.size = size
+        self.entries = OrderedDict()
+
+    def _remember(self, key: int, value: str):
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def get(self, key: int) -> str:
+        if key is None:
+            return None
+
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys) -> dict:
+        found = {}
+        wanted = []
+        for key in dict.fromkeys(keys):
+            if key is None:
+                continue
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                found[key] = self.entries[key]
+            else:
+                wanted.append(key)
+
+        with self.pool.connection() as conn:
+            for placeholders, chunk in in_batches(wanted):
+                for key, value in conn.execute(f"SELECT id, data FROM locale_en WHERE id IN ({placeholders})", chunk):
+                    found[key] = value
+                    self._remember(key, value)
+
+        return found
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Empty, LifoQueue
+import sqlite3
+import threading
+
+# Per connection; sqlite3 keeps these many prepared statements around,
+# keyed by SQL text.
+STATEMENT_CACHE_SIZE = 256
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    uri = f"{Path(path).absolute().as_uri()}?mode=ro"
+    conn = sqlite3.connect(
+        uri,
+        uri=True,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.execute("PRAGMA query_only = ON")
+
+    return conn
+
+
+# Read-only connections to one database, handed out to one user at a
+# time. Connections are opened on demand up to `size` and reused after.
+class ConnectionPool:
+    def __init__(self, path: Path, size: int = 4):
+        self.path = path
+        self.size = size
+        self.idle = LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.closed = False
+
+    @contextmanager
+    def connection(self):
+        conn = self._take()
+        try:
+            yield conn
+        finally:
+            if self.closed:
+                conn.close()
+            else:
+                self.idle.put(conn)
+
+    def _take(self) -> sqlite3.Connection:
+        if self.closed:
+            raise RuntimeError("connection pool is closed")
+
+        try:
+            return self.idle.get_nowait()
+        except Empty:
+            pass
+
+        with self.lock:
+            opening = self.opened < self.size
+            if opening:
+                self.opened += 1
+
+        if opening:
+            try:
+                return connect(self.path)
+            except BaseException:
+                with self.lock:
+                    self.opened -= 1
+                raise
+
+        return self.idle.get()
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except Empty:
+                break
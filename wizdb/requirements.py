@@ -2,6 +2,8 @@ from .utils import SCHOOLS
 
 
 class EquipRequirement:
+    __slots__ = ("id",)
+
     def __init__(self, id: int):
         self.id = id
 
@@ -10,12 +12,16 @@ class EquipRequirement:
 
 
 class LevelRequirement(EquipRequirement):
+    __slots__ = ("level",)
+
     def __init__(self, level: int):
         super().__init__(1)
         self.level = level
 
 
 class SchoolRequirement(EquipRequirement):
+    __slots__ = ("school",)
+
     def __init__(self, op_not: bool, school: bytes):
         super().__init__(2)
         self.school = SCHOOLS.index(school) | (op_not << 31)
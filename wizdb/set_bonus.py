@@ -1,10 +1,17 @@
+from .preload import decode_templates
+
+
 class Bonus:
+    __slots__ = ("activate_count", "stats")
+
     def __init__(self, stats: list, activate_count: int):
         self.activate_count = activate_count
         self.stats = stats
 
 
 class SetBonus:
+    __slots__ = ("name", "bonuses")
+
     def __init__(self, state, obj: dict):
         self.name = state.make_lang_key(obj)
 
@@ -18,23 +25,45 @@ class SetBonus:
             self.bonuses.append(Bonus(stats, bonus["m_numItemsToEquip"]))
 
 
+# Items only note which set bonuses they refer to; the templates are
+# decoded together by `load` once the items are done, so building an
+# item never waits on a set bonus decode.
 class SetBonusCache:
     def __init__(self):
         self.cache = {}
+        self.missing = set()
+        self.pending = {}
 
     def add(self, state, template: int) -> int:
         if template == 0:
             return 0
 
-        if template in self.cache:
+        if template in self.cache or template in self.pending:
             return template
 
-        filename = state.id_to_file.get(template)
-        if filename is None:
+        if template not in state.id_to_file:
+            self.missing.add(template)
             return 0
 
-        file = state.root_wad / filename
-        value = state.de.deserialize(file.read_bytes())
-
-        self.cache[template] = SetBonus(state, value)
+        self.pending[template] = None
         return template
+
+    def load(self, state, jobs: int = 1):
+        templates = list(self.pending)
+        objs = decode_templates(state, [state.id_to_file[t] for t in templates], jobs)
+        for template, obj in zip(templates, objs):
+            self.cache[template] = SetBonus(state, obj)
+
+        self.pending.clear()
+
+    def merge(self, pending: dict, missing: set):
+        for template in pending:
+            if template not in self.cache:
+                self.pending.setdefault(template)
+
+        self.missing |= missing
+
+    def reorder(self, templates):
+        order = [t for t in dict.fromkeys(templates) if t in self.cache]
+        order.extend(t for t in self.cache if t not in order)
+        self.cache = {t: self.cache[t] for t in order}
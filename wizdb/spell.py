@@ -1,25 +1,19 @@
-from kobold_py import KoboldError
 from struct import pack
 
-from .utils import get_school_index, SCHOOLS, SPELL_TYPES
+from .extract import FieldExtractor
+from .utils import fingerprint, get_school_index, SCHOOLS, SPELL_TYPES
 
 
-def find_effects(data: dict, effects, damage_types, num_rounds):
-    for k, v in data.items():
-        if k == "m_effectParam":
-            effects.append(v)
-        elif k == "m_sDamageType":
-            damage_types.append(v)
-        elif k == "m_numRounds":
-            num_rounds.append(v)
-        elif isinstance(v, dict):
-            find_effects(v, effects, damage_types, num_rounds)
-        elif isinstance(v, list):
-            for item in filter(lambda i: isinstance(i, dict), v):
-                find_effects(item, effects, damage_types, num_rounds)
+EFFECT_FIELDS = FieldExtractor("m_effectParam", "m_sDamageType", "m_numRounds")
 
 
 class Spell:
+    __slots__ = (
+        "template", "name", "real_name", "image", "accuracy", "school", "description", "type_name", "rank",
+        "x_pips", "shadow_pips", "fire_pips", "ice_pips", "storm_pips", "myth_pips", "life_pips", "death_pips",
+        "balance_pips", "effect_params", "damage_types", "num_rounds",
+    )
+
     def __init__(self, template_id: int, state, obj: dict):
         self.template = template_id
         self.name = state.make_lang_key(obj)
@@ -45,12 +39,8 @@ class Spell:
         self.death_pips = rank["m_deathPips"]
         self.balance_pips = rank["m_balancePips"]
 
-        self.effect_params = []
+        self.effect_params, raw_damage_types, self.num_rounds = EFFECT_FIELDS.extract(obj)
         self.damage_types = []
-        self.num_rounds = []
-
-        raw_damage_types = []
-        find_effects(obj, self.effect_params, raw_damage_types, self.num_rounds)
 
         for dt in raw_damage_types:
             try:
@@ -60,26 +50,119 @@ class Spell:
 
 
 class SpellCache:
-    def __init__(self, state):
+    def __init__(self, state, lazy: bool = False, names: dict = None):
         self.cache = {}
         self.name_to_id = {}
+        self.missing = set()
 
+        self.lazy = lazy
+        self.position = {}
+        # Lazy mode only: spells decoded while looking for another one,
+        # the manifest entries not looked at yet, keyed by file stem, and
+        # the spell names of the ones read past, mapped to their entry.
+        self.decoded = {}
+        self.pending = {}
+        self.located = {}
+        # Lazy mode only: filename -> [content fingerprint, spell name] of
+        # this manifest's spells, carried over between builds.
+        self.names = {}
+
+        files = {}
         for file, template in state.file_to_id.items():
             if not file.startswith("Spells/"):
                 continue
-            
-            try:
-                value = state.de.deserialize((state.root_wad / file).read_bytes())
-            except KoboldError as Err:
-                print(Err)
-                continue
 
-            spell = Spell(template, state, value)
-            self.cache[template] = spell
-            self.name_to_id[value["m_name"].decode()] = template
+            self.position[template] = len(self.position)
+            if lazy:
+                if names and file in names:
+                    self.names[file] = names[file]
+                self.pending.setdefault(file.rpartition("/")[2].removesuffix(".xml"), []).append((file, template))
+            else:
+                files[file] = template
+
+        for file, data in state.prefetcher.read(state.root_wad, files):
+            if spell := self._load(state, files[file], data):
+                self.cache[files[file]] = spell
 
-    def get(self, name: str) -> int:
-        if tid := self.name_to_id.get(name):
+    def _load(self, state, template: int, data: bytes) -> Spell:
+        try:
+            value = state.de.deserialize(data)
+        except state.de.DecodeError as Err:
+            print(Err)
+            return None
+
+        spell = Spell(template, state, value)
+        self.name_to_id[value["m_name"].decode()] = template
+
+        return spell
+
+    # Spell files are usually named after the spell, so try that one
+    # first. Otherwise the names of all other spells are looked up once,
+    # see `locate`, and only the spell that matches is decoded.
+    def _resolve(self, state, name: str) -> int:
+        for file, template in self.pending.pop(name, []):
+            self._load_file(state, file, template)
+
+        if (tid := self.name_to_id.get(name)) is not None:
             return tid
-        else:
+
+        self.locate(state)
+
+        if (entry := self.located.pop(name, None)) is None:
             return None
+
+        self._load_file(state, *entry)
+        return self.name_to_id.get(name)
+
+    def _load_file(self, state, file: str, template: int):
+        data = (state.root_wad / file).read_bytes()
+        if spell := self._load(state, template, data):
+            self.decoded[template] = spell
+            self.names[file] = [fingerprint(data), spell.real_name.decode()]
+
+    # Maps the name of every spell not looked at yet to its manifest
+    # entry. Names recorded for unchanged files by earlier builds are
+    # reused, so only new or changed spells have to be decoded for this.
+    def locate(self, state):
+        if not self.pending:
+            return
+
+        files = {file: template for entries in self.pending.values() for file, template in entries}
+        self.pending.clear()
+
+        for file, data in state.prefetcher.read(state.root_wad, files):
+            digest = fingerprint(data)
+            entry = self.names.get(file)
+            if entry is None or entry[0] != digest:
+                try:
+                    value = state.de.deserialize(data, observe=False)
+                except state.de.DecodeError as Err:
+                    print(Err)
+                    continue
+
+                entry = self.names[file] = [digest, value["m_name"].decode()]
+
+            self.located.setdefault(entry[1], (file, files[file]))
+
+    def merge(self, spells: dict, missing: set):
+        for template, spell in spells.items():
+            if template not in self.cache:
+                self.cache[template] = spell
+                self.name_to_id[spell.real_name.decode()] = template
+
+        self.missing |= missing - self.name_to_id.keys()
+
+    def in_manifest_order(self) -> list:
+        return sorted(self.cache.items(), key=lambda entry: self.position[entry[0]])
+
+    def get(self, state, name: str) -> int:
+        tid = self.name_to_id.get(name)
+        if tid is None and self.lazy and name not in self.missing:
+            tid = self._resolve(state, name)
+
+        if tid is None:
+            self.missing.add(name)
+        elif tid not in self.cache:
+            self.cache[tid] = self.decoded.pop(tid)
+
+        return tid
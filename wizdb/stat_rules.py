@@ -1,32 +1,50 @@
 from pathlib import Path
-from struct import pack as pk
+from struct import pack as pk, unpack as upk
 
-from kobold_py import op as kobold
-
-from .utils import fnv_1a
+from .utils import fnv_1a_many
 
 
 def _bitpack_float(value: float) -> int:
     encoded = pk("<f", value)
     return int.from_bytes(encoded, "little")
 
+
+# Scaling a float32 by 100 leaves noise past its precision (15% comes out
+# as 15.000000596...), which puts amounts just outside round bounds. Keep
+# float32's 7 significant digits and settle on the float32 nearest to
+# that, so the value and bit-packed columns hold the same number.
+def _percent_amount(value: float) -> float:
+    return upk("<f", pk("<f", float(f"{value * 100:.7g}")))[0]
+
+
 class Stat:
+    __slots__ = ("kind",)
+
     def __init__(self, kind: int):
         self.kind = kind
 
 
 class StatStat(Stat):
-    def __init__(self, category: str, value: int):
+    __slots__ = ("category", "value", "amount")
+
+    def __init__(self, category: int, value: int, amount: float):
         super().__init__(1)
 
-        self.category = fnv_1a(category)
+        self.category = category
+        # The float bit-packed into an int, and the float itself.
         self.value = value
+        self.amount = amount
 
     def __repr__(self):
         return f"{self.category}={self.value}"
 
+    def row(self) -> tuple:
+        return 1, self.category, self.value, self.amount
+
 
 class PipStat(Stat):
+    __slots__ = ("pips", "power_pips")
+
     def __init__(self, pips: int, power_pips: int):
         super().__init__(2)
 
@@ -37,8 +55,13 @@ class PipStat(Stat):
     def extract(cls, obj: dict):
         return cls(obj["m_pipsGiven"], obj["m_powerPipsGiven"])
 
+    def row(self) -> tuple:
+        return 2, self.pips, self.power_pips, None
+
 
 class SpellStat(Stat):
+    __slots__ = ("spell", "count")
+
     def __init__(self, state, spell: int, count: int):
         super().__init__(3)
 
@@ -52,8 +75,13 @@ class SpellStat(Stat):
         else:
             return None
 
+    def row(self) -> tuple:
+        return 3, self.spell, self.count, None
+
 
 class MayCastStat(Stat):
+    __slots__ = ("spell", "desc_key")
+
     def __init__(self, state, spell: int, desc: bytes):
         super().__init__(4)
 
@@ -71,8 +99,13 @@ class MayCastStat(Stat):
         else:
             return None
 
+    def row(self) -> tuple:
+        return 4, self.spell, self.desc_key.id, None
+
 
 class SpeedStat(Stat):
+    __slots__ = ("multiplier",)
+
     def __init__(self, multiplier: int):
         super().__init__(5)
 
@@ -82,8 +115,13 @@ class SpeedStat(Stat):
     def extract(cls, obj: dict):
         return cls(obj["m_speedMultiplier"])
 
+    def row(self) -> tuple:
+        return 5, self.multiplier, 0, None
+
 
 class MultiPassengerStat(Stat):
+    __slots__ = ("count",)
+
     def __init__(self, count: int):
         super().__init__(6)
 
@@ -93,50 +131,112 @@ class MultiPassengerStat(Stat):
     def extract(cls, obj: dict):
         return cls(obj["m_numSeats"])
 
+    def row(self) -> tuple:
+        return 6, self.count, 0, None
+
+
+# Effects we don't turn into stats.
+# TODO: Chances are we may actually need to handle some of this.
+IGNORED_EFFECTS = frozenset((
+    "ShieldBuff", "Transformation", "BlackhawkFireJewelEffect01", "BlackhawkIceJewelEffect01",
+    "BlackhawkStormJewelEffect01", "BlackhawkBalanceJewelEffect01", "BlackhawkDeathJewelEffect01",
+    "BlackhawkLifeJewelEffect01", "BlackhawkMythJewelEffect01", "BlackhawkAllSchoolsJewelEffect01",
+    "MorganthJewelEffect", "MeaninglessDOT", "HitpointBuff", "TwentyPercentPowerPips", "SixtyPercentPowerPips",
+    "ProvideFourFireElves", "ProvideNineWandFire1", "ProvideNineWandIce1", "ProvideNineWandStorm1",
+    "ProvideNineWandMyth1", "PostCombatEffect", "PostCombatEffect2", "ProvideSpell", "Invisible",
+    "NonPersistentInvisible", "NonPersistentInvisibleToAll", "StartingPips", "CombatSpeed", "RecallHome",
+    "CantGoHome", "CantTransfer", "RideState", "CantPlayPVP",
+))
+
+# Categories whose values are stored as percentages, unless flat.
+PERCENT_CATEGORIES = ("Damage", "Piercing", "Accuracy", "PowerPips", "Healing", "ReduceDamage", "StunResistance", "FishingLuck")
+
+
+class CompiledEffect:
+    __slots__ = ("name", "category", "table", "vector", "percent")
+
+    def __init__(self, name: str, category: int, table: str, vector: list, percent: bool):
+        self.name = name
+        self.category = category
+        self.table = table
+        self.vector = vector
+        self.percent = percent
+
 
 class StatRules:
-    def __init__(self, de: kobold.BinaryDeserializer, canonical: Path, rule_dir: Path):
+    def __init__(self, de, canonical: Path, rule_dir: Path):
         self.tables = {}
+        self.sources = [canonical, *sorted(rule_dir.glob("*.xml"))]
 
-        for file in rule_dir.glob("*.xml"):
+        for file in self.sources[1:]:
             obj = de.deserialize(file.read_bytes())
             self.tables[obj["m_tableName"].decode()] = obj
 
         self.canonical_effects = de.deserialize(canonical.read_bytes())
 
-    def _translate_stat(self, name: str, idx: int) -> Stat:
+        # Canonical effects by name; the first definition of a name wins.
+        templates = {}
         for template in self.canonical_effects["m_effectTemplates"]:
-            if template["m_effectName"].decode() == name:
-                category = template["m_effectCategory"].decode()
-                table = template["m_statTableName"].decode()
-                flat = "Flat" in name
+            templates.setdefault(template["m_effectName"].decode(), template)
+
+        # Stats are categorized by the hash of their effect name.
+        hashes = fnv_1a_many(templates)
+
+        self.effects = {}
+        for (name, template), name_hash in zip(templates.items(), hashes):
+            category = template["m_effectCategory"].decode()
+            table = template["m_statTableName"].decode()
+
+            vector = self.tables[table]["m_statVector"] if table in self.tables else None
+            percent = any(i in category for i in PERCENT_CATEGORIES) and "Flat" not in name
 
-                if not table:
-                    value = 1.0
-                else:
-                    table = self.tables[table]
-                    value = table["m_statVector"][idx]
+            self.effects[name] = CompiledEffect(name, name_hash, table, vector, percent)
+
+        # (effect name, lookup index) -> StatStat, shared by everything
+        # that grants the same stat.
+        self.memo = {}
+        # Database row -> Stat, so equal stats are only held once.
+        self.interned = {}
+
+    def intern(self, stat: Stat) -> Stat:
+        if stat is None:
+            return None
+
+        return self.interned.setdefault(stat.row(), stat)
+
+    def _translate_stat(self, name: str, idx: int) -> Stat:
+        if (stat := self.memo.get((name, idx))) is not None:
+            return stat
+
+        effect = self.effects.get(name)
+        if effect is None:
+            raise ValueError(f"Unknown stat {name}")
+
+        if not effect.table:
+            value = 1.0
+        elif effect.vector is None:
+            raise KeyError(effect.table)
+        else:
+            value = effect.vector[idx]
 
-                if any(i in category for i in ("Damage", "Piercing", "Accuracy", "PowerPips", "Healing", "ReduceDamage", "StunResistance", "FishingLuck")) and not flat:
-                    value *= 100
-    
-                return StatStat(name, _bitpack_float(value))
+        if effect.percent:
+            value = _percent_amount(value)
 
-        raise ValueError(f"Unknown stat {name}")
+        stat = self.memo[(name, idx)] = self.intern(StatStat(effect.category, _bitpack_float(value), value))
+        return stat
 
     def translate(self, state, obj: dict) -> Stat:
         name = obj["m_effectName"].decode()
 
         if name == "StartingPips":
-            return PipStat.extract(obj)
+            return self.intern(PipStat.extract(obj))
         elif name == "ProvideSpell":
-            return SpellStat.extract(state, obj)
+            return self.intern(SpellStat.extract(state, obj))
         elif name == "ProvideCombatTrigger":
-            return MayCastStat.extract(state, obj)
+            return self.intern(MayCastStat.extract(state, obj))
         elif name == "SpeedBuff":
-            return SpeedStat.extract(obj)
-        elif name in ("ShieldBuff", "Transformation", "BlackhawkFireJewelEffect01", "BlackhawkIceJewelEffect01", "BlackhawkStormJewelEffect01", "BlackhawkBalanceJewelEffect01", "BlackhawkDeathJewelEffect01", "BlackhawkLifeJewelEffect01", "BlackhawkMythJewelEffect01", "BlackhawkAllSchoolsJewelEffect01", "MorganthJewelEffect", "MeaninglessDOT", "HitpointBuff", "TwentyPercentPowerPips", "SixtyPercentPowerPips", "ProvideFourFireElves", "ProvideNineWandFire1", "ProvideNineWandIce1", "ProvideNineWandStorm1", "ProvideNineWandMyth1", "PostCombatEffect", "PostCombatEffect2", "ProvideSpell", "Invisible", "NonPersistentInvisible", "NonPersistentInvisibleToAll", "StartingPips", "CombatSpeed", "RecallHome", "CantGoHome", "CantTransfer", "RideState", "CantPlayPVP"):
-            # TODO: Chances are we may actually need to handle some of this.
+            return self.intern(SpeedStat.extract(obj))
+        elif name in IGNORED_EFFECTS:
             return None
         else:
             return self._translate_stat(name, obj["m_lookupIndex"])
@@ -1,62 +1,90 @@
 from pathlib import Path
 
-from kobold_py import op as kobold
-
 from .lang_files import LangCache, LangKey
+from .prefetch import Prefetcher
+from .profile import NULL_PROFILER
 from .set_bonus import SetBonusCache
 from .spell import SpellCache
 from .stat_rules import StatRules
 from .talent import TalentCache
 
 
-class BinDeserializer(kobold.BinaryDeserializer):
-    @staticmethod
-    def make(types_path: Path):
-        opts = kobold.DeserializerOptions()
-        opts.flags = 1
-        opts.shallow = False
-        opts.skip_unknown_types = True
-
-        types = kobold.TypeList(types_path.read_text())
-
-        return BinDeserializer(opts, types)
-
+def __getattr__(name: str):
+    # Importing the kobold bindings is deferred until a State actually
+    # needs them, so builds with another deserializer can do without.
+    if name == "BinDeserializer":
+        from .bin_deserializer import BinDeserializer
+        return BinDeserializer
 
-    def deserialize(self, data):
-        if data.startswith(b"BINd"):
-            data = data[4:]
-
-        return super().deserialize(data)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class State:
-    def __init__(self, root_wad: Path, types: Path):
+    def __init__(
+        self,
+        root_wad: Path,
+        types: Path,
+        decode_cache: Path = None,
+        locale_index: Path = None,
+        profiler=NULL_PROFILER,
+        make_deserializer=None,
+        lazy_spells: bool = False,
+        prefetcher: Prefetcher = None,
+        jobs: int = 1,
+        talents: TalentCache = None,
+        collect_shapes: bool = False,
+        stat_rules: StatRules = None,
+        file_to_id: dict = None,
+        spells: SpellCache = None,
+        spell_names: dict = None,
+    ):
+        if make_deserializer is None:
+            from .bin_deserializer import BinDeserializer
+            make_deserializer = BinDeserializer.make
+
         self.root_wad = root_wad
-        self.de = BinDeserializer.make(types)
-        self.cache = LangCache(root_wad / "Locale" / "English")
-        self.stat_rules = StatRules(
-            self.de,
-            root_wad / "GameEffectData" / "CanonicalStatEffects.xml",
-            root_wad / "GameEffectRuleData"
-        )
+        self.types = types
+        self.decode_cache = decode_cache
+        self.locale_index = locale_index
+        self.profiler = profiler
+        self.make_deserializer = make_deserializer
+        self.lazy_spells = lazy_spells
+        self.prefetcher = prefetcher if prefetcher is not None else Prefetcher()
+        self.jobs = jobs
+
+        self.de = make_deserializer(types, decode_cache)
+        self.de.profiler = profiler
+        if collect_shapes:
+            self.de.collect_shapes()
+        self.cache = LangCache(root_wad / "Locale" / "English", locale_index, profiler)
+
+        # Build workers are handed the stat rules, manifest, spells and
+        # talents their parent already decoded.
+        with profiler.stage("stat rules"):
+            self.stat_rules = stat_rules if stat_rules is not None else StatRules(
+                self.de,
+                root_wad / "GameEffectData" / "CanonicalStatEffects.xml",
+                root_wad / "GameEffectRuleData"
+            )
         self.bonuses = SetBonusCache()
 
-        self.file_to_id = {}
-        self.id_to_file = {}
-
-        manifest = self.de.deserialize((root_wad / "TemplateManifest.xml").read_bytes())
-        for entry in manifest["m_serializedTemplates"]:
-            filename = entry["m_filename"].decode()
-            tid = entry["m_id"]
+        with profiler.stage("manifest"):
+            if file_to_id is None:
+                file_to_id = {}
+                manifest = self.de.deserialize((root_wad / "TemplateManifest.xml").read_bytes())
+                for entry in manifest["m_serializedTemplates"]:
+                    file_to_id[entry["m_filename"].decode()] = entry["m_id"]
 
-            self.file_to_id[filename] = tid
-            self.id_to_file[tid] = filename
+            self.file_to_id = file_to_id
+            self.id_to_file = {tid: filename for filename, tid in file_to_id.items()}
 
-        self.spells = SpellCache(self)
-        self.talents = TalentCache(self)
+        with profiler.stage("spells"):
+            self.spells = spells if spells is not None else SpellCache(self, lazy_spells, spell_names)
+        with profiler.stage("talents"):
+            self.talents = talents if talents is not None else TalentCache(self, jobs)
 
     def add_spell(self, name: str) -> int:
-        return self.spells.get(name)
+        return self.spells.get(self, name)
 
     def translate_stat(self, obj: dict):
         return self.stat_rules.translate(self, obj)
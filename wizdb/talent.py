@@ -1,3 +1,6 @@
+from .preload import decode_templates
+
+
 class Talent:
     def __init__(self, template_id: int, state, obj: dict):
         self.template_id = template_id
@@ -5,15 +8,13 @@ class Talent:
 
 
 class TalentCache:
-    def __init__(self, state):
+    def __init__(self, state, jobs: int = 1):
         self.cache = {}
         self.name_to_id = {}
 
-        for file, template in state.file_to_id.items():
-            if not file.startswith("TalentData/"):
-                continue
-
-            value = state.de.deserialize((state.root_wad / file).read_bytes())
+        files = {f: t for f, t in state.file_to_id.items() if f.startswith("TalentData/")}
+        for file, value in zip(files, decode_templates(state, list(files), jobs)):
+            template = files[file]
 
             talent = Talent(template, state, value)
             self.cache[template] = talent
@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+# Bump whenever `classify_template` changes meaning, so stale
+# classifications from older builds are thrown away.
+INDEX_VERSION = 2
+
+OTHER = 0
+ITEM = 1
+MOB = 2
+
+# Only tracked in the build records of an existing items.db.
+SPELL = 3
+SET_BONUS = 4
+TALENT = 5
+LOCALE = 6
+
+
+class TemplateIndex:
+    def __init__(self, entries: dict = None, types: str = None, spell_names: dict = None):
+        # filename -> [content fingerprint, template kind]
+        self.entries = entries or {}
+        # Fingerprint of the types.json the templates were classified with.
+        self.types = types
+        # Spell filename -> [content fingerprint, spell name], so looking a
+        # spell up by name doesn't need every spell decoded again.
+        self.spell_names = spell_names or {}
+
+    # A different types.json can decode the same file differently, so an
+    # index made with another one is thrown away as a whole.
+    @classmethod
+    def load(cls, path: Path, types: str = None):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return cls(types=types)
+
+        if data.get("version") != INDEX_VERSION or data.get("types") != types:
+            return cls(types=types)
+
+        return cls(data["entries"], types, data.get("spell_names"))
+
+    def save(self, path: Path):
+        path.write_text(json.dumps({
+            "version": INDEX_VERSION,
+            "types": self.types,
+            "entries": self.entries,
+            "spell_names": self.spell_names,
+        }))
+
+    def kind(self, filename: str, digest: str) -> int:
+        if entry := self.entries.get(filename):
+            if entry[0] == digest:
+                return entry[1]
+
+        return None
+
+    def record(self, filename: str, digest: str, kind: int):
+        self.entries[filename] = [digest, kind]
+
+    def subset(self, filenames) -> "TemplateIndex":
+        return TemplateIndex({f: self.entries[f] for f in filenames if f in self.entries}, self.types)
+
+    def merge(self, other: "TemplateIndex"):
+        self.entries.update(other.entries)
+
+    def retain(self, filenames):
+        filenames = set(filenames)
+        self.entries = {f: e for f, e in self.entries.items() if f in filenames}
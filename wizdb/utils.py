@@ -1,6 +1,13 @@
+from hashlib import blake2b
+import multiprocessing
 from struct import pack
 from typing import List
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 SCHOOLS = [
     b"",
     b"Fire",
@@ -44,6 +51,14 @@ SPELL_TYPES = [
 ]
 
 
+# Start method for decoder pools. By the time one starts, this process may
+# already run writer and prefetch threads, and forking with live threads
+# can deadlock the child, so workers never fork off this process directly.
+def worker_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
 def pack_int_blob(data: List[int]) -> bytes:
     data_len = len(data)
     return pack(f"<B{data_len}i", data_len, *data)
@@ -69,13 +84,70 @@ def convert_rarity(obj: dict) -> int:
         return -1
 
 
-def fnv_1a(data) -> int:
-    if isinstance(data, str):
-        data = data.encode()
+FNV_OFFSET_BASIS = 0xCBF2_9CE4_8422_2325
+FNV_PRIME = 0x0000_0100_0000_01B3
+
+# Batches smaller than this aren't worth the NumPy setup cost.
+VECTORIZE_THRESHOLD = 64
+
+_fnv_memo = {}
 
-    state = 0xCBF2_9CE4_8422_2325
+
+def _fnv_1a(data: bytes) -> int:
+    state = FNV_OFFSET_BASIS
     for b in data:
-        state ^= b
-        state *= 0x0000_0100_0000_01B3
-        state &= 0xFFFF_FFFF_FFFF_FFFF
+        state = ((state ^ b) * FNV_PRIME) & 0xFFFF_FFFF_FFFF_FFFF
     return state >> 1
+
+
+def fnv_1a(data) -> int:
+    if (h := _fnv_memo.get(data)) is not None:
+        return h
+
+    key = data.encode() if isinstance(data, str) else data
+    h = _fnv_memo[data] = _fnv_1a(key)
+    return h
+
+
+def _fnv_1a_vectorized(keys: List[bytes]) -> List[int]:
+    # Hash all keys in lockstep, one byte column at a time, over a single
+    # packed buffer. Keys are processed longest first so that the keys
+    # still being hashed at column `j` are always a prefix of the batch.
+    order = sorted(range(len(keys)), key=lambda i: len(keys[i]), reverse=True)
+    packed = [keys[i] for i in order]
+
+    lengths = np.fromiter(map(len, packed), dtype=np.int64, count=len(packed))
+    starts = np.zeros(len(packed), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    buffer = np.frombuffer(b"".join(packed), dtype=np.uint8)
+
+    state = np.full(len(packed), FNV_OFFSET_BASIS, dtype=np.uint64)
+    prime = np.uint64(FNV_PRIME)
+    active = len(packed)
+    for j in range(int(lengths[0]) if len(packed) else 0):
+        while lengths[active - 1] <= j:
+            active -= 1
+
+        # uint64 arithmetic wraps, which is exactly the 64-bit FNV step.
+        state[:active] ^= buffer[starts[:active] + j]
+        state[:active] *= prime
+
+    state >>= np.uint64(1)
+
+    hashes = [0] * len(keys)
+    for i, h in zip(order, state.tolist()):
+        hashes[i] = h
+    return hashes
+
+
+def fnv_1a_many(keys) -> List[int]:
+    keys = [k.encode() if isinstance(k, str) else bytes(k) for k in keys]
+
+    if np is not None and len(keys) >= VECTORIZE_THRESHOLD:
+        return _fnv_1a_vectorized(keys)
+    else:
+        return [_fnv_1a(k) for k in keys]
+
+
+def fingerprint(data) -> str:
+    return blake2b(data, digest_size=16).hexdigest()
@@ -0,0 +1,161 @@
+from fnmatch import fnmatchcase
+import mmap
+from pathlib import Path
+from struct import Struct
+import zlib
+
+# KIWAD archive layout:
+#
+# magic "KIWAD", u32 version, u32 file count, u8 flags (version >= 2),
+# then one entry per file:
+#
+#   u32 offset, u32 size, u32 compressed size, u8 compressed, u32 crc,
+#   u32 name length, name (NUL-terminated)
+_HEADER = Struct("<5sII")
+_ENTRY = Struct("<III?II")
+
+
+class WadEntry:
+    __slots__ = ("offset", "size", "compressed_size", "compressed", "crc")
+
+    def __init__(self, offset: int, size: int, compressed_size: int, compressed: bool, crc: int):
+        self.offset = offset
+        self.size = size
+        self.compressed_size = compressed_size
+        self.compressed = compressed
+        self.crc = crc
+
+
+class Wad:
+    def __init__(self, path: Path):
+        self.path = path
+        self.entries = {}
+        self.dirs = set()
+
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        magic, version, count = _HEADER.unpack_from(self._map, 0)
+        if magic != b"KIWAD":
+            raise ValueError(f"{path} is not a KIWAD archive")
+
+        pos = _HEADER.size + (1 if version >= 2 else 0)
+        for _ in range(count):
+            offset, size, compressed_size, compressed, crc, name_len = _ENTRY.unpack_from(self._map, pos)
+            pos += _ENTRY.size
+
+            name = bytes(self._view[pos:pos + name_len]).rstrip(b"\0").decode()
+            pos += name_len
+
+            self.entries[name] = WadEntry(offset, size, compressed_size, compressed, crc)
+
+            parent, _, _ = name.rpartition("/")
+            while parent and parent not in self.dirs:
+                self.dirs.add(parent)
+                parent, _, _ = parent.rpartition("/")
+
+    def read(self, name: str):
+        entry = self.entries.get(name)
+        if entry is None:
+            raise FileNotFoundError(f"{name} not found in {self.path}")
+
+        if entry.compressed:
+            data = self._view[entry.offset:entry.offset + entry.compressed_size]
+            return zlib.decompress(data, bufsize=entry.size)
+
+        # Uncompressed entries are handed out as views into the mapping.
+        return self._view[entry.offset:entry.offset + entry.size]
+
+
+_archives = {}
+
+
+def open_wad(path: Path) -> Wad:
+    # One mapping per archive and process; WadPaths only carry the
+    # archive's filename so they can be sent to worker processes.
+    path = Path(path).absolute()
+    if (wad := _archives.get(path)) is None:
+        wad = _archives[path] = Wad(path)
+
+    return wad
+
+
+class WadPath:
+    def __init__(self, archive: Path, name: str = ""):
+        self.archive = Path(archive)
+        self.path = name.strip("/")
+
+    @property
+    def wad(self) -> Wad:
+        return open_wad(self.archive)
+
+    @property
+    def name(self) -> str:
+        return self.path.rpartition("/")[2]
+
+    @property
+    def suffix(self) -> str:
+        name = self.name
+        idx = name.rfind(".")
+        return name[idx:] if idx > 0 else ""
+
+    def __truediv__(self, other) -> "WadPath":
+        other = str(other).strip("/")
+        return WadPath(self.archive, f"{self.path}/{other}" if self.path else other)
+
+    def with_suffix(self, suffix: str) -> "WadPath":
+        stem = self.path[:len(self.path) - len(self.suffix)] if self.suffix else self.path
+        return WadPath(self.archive, stem + suffix)
+
+    def relative_to(self, other: "WadPath") -> str:
+        if not other.path:
+            return self.path
+        if not self.path.startswith(other.path + "/"):
+            raise ValueError(f"{self.path} is not in {other.path}")
+
+        return self.path[len(other.path) + 1:]
+
+    def exists(self) -> bool:
+        return self.is_file() or self.is_dir()
+
+    def is_file(self) -> bool:
+        return self.path in self.wad.entries
+
+    def is_dir(self) -> bool:
+        return not self.path or self.path in self.wad.dirs
+
+    def read_bytes(self):
+        return self.wad.read(self.path)
+
+    def glob(self, pattern: str):
+        prefix = f"{self.path}/" if self.path else ""
+        recursive = pattern.startswith("**/")
+        if recursive:
+            pattern = pattern[3:]
+
+        for name in self.wad.entries:
+            if not name.startswith(prefix):
+                continue
+
+            rest = name[len(prefix):]
+            if "/" in rest and not recursive:
+                continue
+
+            if fnmatchcase(rest.rpartition("/")[2], pattern):
+                yield WadPath(self.archive, name)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, WadPath) and (self.archive, self.path) == (other.archive, other.path)
+
+    def __lt__(self, other: "WadPath") -> bool:
+        return self.path < other.path
+
+    def __hash__(self) -> int:
+        return hash((self.archive, self.path))
+
+    def __str__(self) -> str:
+        return f"{self.archive}:{self.path}"
+
+    def __repr__(self) -> str:
+        return f"WadPath({str(self.archive)!r}, {self.path!r})"